@@ -2,7 +2,12 @@
 Dependency injection functions for TrendVest.
 Avoids circular imports: routers import deps, main sets deps at startup.
 """
-from typing import Optional
+from typing import Annotated, Optional
+
+import asyncpg
+from fastapi import Depends
+
+from .services.stocks import StockPriceService
 
 _db_pool = None
 _stock_service = None
@@ -26,6 +31,11 @@ async def get_db_pool():
 
 async def get_stock_service():
     if _stock_service is None:
-        from .services.stocks import StockPriceService
-        set_stock_service(StockPriceService())
+        raise RuntimeError("Stock price service not initialized")
     return _stock_service
+
+
+# Kept async: FastAPI awaits async dependencies inline, while sync ones are
+# dispatched to the threadpool on every request
+DbPool = Annotated[asyncpg.Pool, Depends(get_db_pool)]
+StockService = Annotated[StockPriceService, Depends(get_stock_service)]
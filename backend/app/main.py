@@ -5,6 +5,8 @@ Run:
     uvicorn app.main:app --reload --port 8000
 """
 import os
+import asyncio
+import tempfile
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -16,14 +18,24 @@ env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(env_path)
 
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from cachetools import TTLCache
 
-from .models.database import get_pool, init_db
+from .models.database import get_pool, init_db, load_last_prices, save_last_prices
 from .models.schemas import HealthResponse
-from .services.stocks import StockPriceService
+from .middleware import FastCORSMiddleware, ResponseCacheMiddleware
+from .services.stocks import StockPriceService, StockPrice
+from .services.cache import shared_cache
+from .services.http_client import aclose_http_client
+from .services.interactions import interaction_log
 from . import deps
 
 
+PRICE_CACHE_FILE = Path(os.getenv(
+    "PRICE_CACHE_FILE", str(Path(tempfile.gettempdir()) / "trendvest_price_cache.json")
+))
+
+
 async def _warmup_cache(pool, stock_service: StockPriceService):
     """Pre-fetch all stock prices in background so first page load is fast."""
     try:
@@ -32,8 +44,12 @@ async def _warmup_cache(pool, stock_service: StockPriceService):
         tickers = [r["ticker"] for r in rows]
         if tickers:
             print(f"  Warming price cache for {len(tickers)} tickers...")
-            stock_service.get_prices_batch(tickers)
+            # yfinance is blocking, so off the event loop; it already downloads with threads
+            await asyncio.to_thread(stock_service.get_prices_batch, tickers)
             print(f"  Cache warm: {len(stock_service._cache)} prices loaded")
+            await save_last_prices(pool, list(stock_service._cache.values()))
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         print(f"  Cache warmup failed (non-fatal): {e}")
 
@@ -48,10 +64,43 @@ async def lifespan(app: FastAPI):
     stock_service = StockPriceService()
     deps.set_stock_service(stock_service)
     print("Database ready")
-    await _warmup_cache(pool, stock_service)
+    await shared_cache.connect()
+    if shared_cache.remote:
+        print("Shared cache: Redis")
+    restored = stock_service.load_snapshot(PRICE_CACHE_FILE)
+    if restored:
+        print(f"  Restored {restored} cached prices from {PRICE_CACHE_FILE}")
+    restored = stock_service.restore([
+        StockPrice(
+            ticker=r["ticker"],
+            price=r["price"],
+            change=r["change"],
+            change_pct=r["change_pct"],
+            previous_close=r["previous_close"],
+            fetched_at=r["updated_at"],
+        )
+        for r in await load_last_prices(pool)
+    ])
+    if restored:
+        print(f"  Restored {restored} last-known prices from database")
+    interaction_log.start(pool)
+    # Serve requests immediately; cache misses fall back to on-demand fetches
+    app.state.warmup_task = asyncio.create_task(_warmup_cache(pool, stock_service))
     print("TrendVest API is running!\n")
     yield
-    await pool.close()
+    app.state.warmup_task.cancel()
+    try:
+        await interaction_log.stop()
+        stock_service.save_snapshot(PRICE_CACHE_FILE)
+    finally:
+        # Don't let one stuck connection hang shutdown
+        try:
+            await asyncio.wait_for(pool.close(), timeout=5)
+        except asyncio.TimeoutError:
+            print("  Pool close timed out, terminating connections")
+            pool.terminate()
+        await shared_cache.close()
+        await aclose_http_client()
     print("\nTrendVest API shutting down")
 
 
@@ -60,13 +109,18 @@ app = FastAPI(
     description="API for trend tracking and stock screening platform",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# Short-lived cache for read-only GETs. Added before CORS so it sits inside it and
+# CORS headers are still computed per request rather than replayed from the cache.
+app.add_middleware(ResponseCacheMiddleware)
+
 # CORS
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
 
 app.add_middleware(
-    CORSMiddleware,
+    FastCORSMiddleware,
     allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
@@ -86,15 +140,27 @@ app.include_router(auth.router)
 app.include_router(recommendations.router)
 
 
+HEALTH_SQL = """
+    SELECT (SELECT COUNT(*) FROM topics WHERE is_active = true) AS topics_count,
+           (SELECT MAX(updated_at) FROM momentum_scores) AS last_run
+"""
+
+# Liveness probes poll every second; the DB figures only need to be a few seconds fresh
+_health_cache = TTLCache(maxsize=1, ttl=5)
+
+
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
     pool = deps._db_pool
     topics_count = 0
     last_run = None
     if pool:
-        async with pool.acquire() as conn:
-            topics_count = await conn.fetchval("SELECT COUNT(*) FROM topics WHERE is_active = true") or 0
-            last_run = await conn.fetchval("SELECT MAX(updated_at) FROM momentum_scores")
+        cached = _health_cache.get("db")
+        if cached is None:
+            async with pool.acquire() as conn:
+                row = await conn.fetchrow(HEALTH_SQL)
+            cached = _health_cache["db"] = (row["topics_count"] or 0, row["last_run"])
+        topics_count, last_run = cached
     return HealthResponse(
         status="ok",
         version="1.0.0",
@@ -0,0 +1,98 @@
+"""
+ASGI middleware for TrendVest.
+"""
+import hashlib
+
+from cachetools import TTLCache
+from starlette.middleware.cors import CORSMiddleware
+
+
+class ResponseCacheMiddleware:
+    """Serve repeat GETs of read-only endpoints from a short-lived in-process cache.
+
+    Stores the already-serialized body with an ETag so hits skip the endpoint and
+    JSON encoding entirely, and clients presenting a matching If-None-Match get a 304.
+    """
+
+    def __init__(self, app, paths=("/",), prefixes=("/api/trends",),
+                 ttl: float = 5, maxsize: int = 1024):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.prefixes = tuple(prefixes)
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _cacheable(self, scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return False
+        path = scope["path"]
+        if path not in self.paths and not path.startswith(self.prefixes):
+            return False
+        # Never share responses that may depend on the caller's identity
+        return not any(name == b"authorization" for name, _ in scope["headers"])
+
+    async def __call__(self, scope, receive, send):
+        if not self._cacheable(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["path"], scope["query_string"])
+        entry = self._cache.get(key)
+        if entry is None:
+            status, headers, body = await self._render(scope, receive)
+            if status != 200:
+                await _send(send, status, headers, body)
+                return
+            etag = b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+            headers = [(k, v) for k, v in headers if k not in (b"content-length", b"etag")]
+            headers.append((b"etag", etag))
+            entry = self._cache[key] = (headers, body, etag)
+
+        headers, body, etag = entry
+        if etag in _if_none_match(scope):
+            # A 304 repeats the caching headers so the client can refresh its freshness
+            await _send(send, 304, [(k, v) for k, v in headers if k in _NOT_MODIFIED_HEADERS], b"")
+            return
+        await _send(send, 200, headers, body)
+
+    async def _render(self, scope, receive):
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        return start["status"], list(start.get("headers", [])), b"".join(chunks)
+
+
+_NOT_MODIFIED_HEADERS = frozenset((b"etag", b"cache-control", b"vary"))
+
+
+def _if_none_match(scope) -> set:
+    for name, value in scope["headers"]:
+        if name == b"if-none-match":
+            return {tag.strip() for tag in value.split(b",")}
+    return set()
+
+
+async def _send(send, status: int, headers: list, body: bytes):
+    if status != 304:
+        headers = [(k, v) for k, v in headers if k != b"content-length"]
+        headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class FastCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware with a set lookup for the origin check instead of a list scan."""
+
+    def __init__(self, app, allow_origins=(), **kwargs):
+        origins = frozenset(o.strip() for o in allow_origins if o.strip())
+        super().__init__(app, allow_origins=list(origins), **kwargs)
+        self.allow_origins_set = origins
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        return self.allow_all_origins or origin in self.allow_origins_set
@@ -1,14 +1,20 @@
 """
 Pydantic models for TrendVest API request/response schemas.
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+# Response models are built once per request and never mutated afterwards
+FROZEN = ConfigDict(frozen=True)
+
 
 # ── Stock Models ──
 
-class TopicStock(BaseModel):
+# Allocated by the hundreds per response, so slotted dataclasses instead of models
+@dataclass(frozen=True, slots=True)
+class TopicStock:
     ticker: str
     company_name: str
     relevance_note: str = ""
@@ -18,6 +24,8 @@ class TopicStock(BaseModel):
 
 
 class StockDetail(BaseModel):
+    model_config = FROZEN
+
     ticker: str
     company_name: str
     sector: str
@@ -32,6 +40,8 @@ class StockDetail(BaseModel):
 # ── Trend Models ──
 
 class TrendTopic(BaseModel):
+    model_config = FROZEN
+
     slug: str
     name_en: str
     name_he: str
@@ -45,6 +55,8 @@ class TrendTopic(BaseModel):
 
 
 class TrendTopicBrief(BaseModel):
+    model_config = FROZEN
+
     slug: str
     name_he: str
     sector: str
@@ -64,6 +76,8 @@ class ChatRequest(BaseModel):
 
 
 class ChatResponse(BaseModel):
+    model_config = FROZEN
+
     answer: str
     suggested_questions: list[str] = []
     questions_remaining: int = 0
@@ -95,12 +109,16 @@ class LoginRequest(BaseModel):
 
 
 class TokenResponse(BaseModel):
+    model_config = FROZEN
+
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
 
 
 class UserProfile(BaseModel):
+    model_config = FROZEN
+
     id: str
     email: str
     display_name: str
@@ -117,7 +135,8 @@ class TradeRequest(BaseModel):
     quantity: int = Field(..., gt=0)
 
 
-class HoldingResponse(BaseModel):
+@dataclass(frozen=True, slots=True)
+class HoldingResponse:
     ticker: str
     quantity: int
     avg_cost: float
@@ -128,6 +147,8 @@ class HoldingResponse(BaseModel):
 
 
 class PortfolioResponse(BaseModel):
+    model_config = FROZEN
+
     session_id: str
     cash_balance: float
     total_value: float
@@ -136,6 +157,8 @@ class PortfolioResponse(BaseModel):
 
 
 class TradeHistoryItem(BaseModel):
+    model_config = FROZEN
+
     ticker: str
     action: str
     quantity: int
@@ -147,6 +170,8 @@ class TradeHistoryItem(BaseModel):
 # ── Stock Profile Models ──
 
 class CompanyOfficer(BaseModel):
+    model_config = FROZEN
+
     name: str
     title: str
     age: int | None = None
@@ -155,6 +180,8 @@ class CompanyOfficer(BaseModel):
 
 
 class StockProfileResponse(BaseModel):
+    model_config = FROZEN
+
     ticker: str
     name: str
     summary: str = ""
@@ -195,6 +222,8 @@ class ExplainTermRequest(BaseModel):
 
 
 class ExplainTermResponse(BaseModel):
+    model_config = FROZEN
+
     term: str
     explanation: str
 
@@ -207,6 +236,8 @@ class ExplainSectionRequest(BaseModel):
 
 
 class ExplainSectionResponse(BaseModel):
+    model_config = FROZEN
+
     ticker: str
     section: str
     explanation: str
@@ -215,6 +246,8 @@ class ExplainSectionResponse(BaseModel):
 # ── Peer Comparison Models ──
 
 class PeerStock(BaseModel):
+    model_config = FROZEN
+
     ticker: str
     company_name: str
     current_price: float | None = None
@@ -237,6 +270,8 @@ class ResearchRequest(BaseModel):
 
 
 class ResearchResponse(BaseModel):
+    model_config = FROZEN
+
     ticker: str
     analysis: str
     citations: list[dict] = []
@@ -247,13 +282,15 @@ class ResearchResponse(BaseModel):
 
 class TrackRequest(BaseModel):
     interaction_type: str = Field(..., pattern="^(topic_view|stock_click|search|news_click|watchlist_add|chat_ask)$")
-    target_slug: str | None = None
+    target_slug: str | None = Field(None, max_length=50)
     metadata: dict | None = None
 
 
 # ── General ──
 
 class HealthResponse(BaseModel):
+    model_config = FROZEN
+
     status: str
     version: str
     timestamp: datetime
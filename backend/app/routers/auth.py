@@ -2,74 +2,122 @@
 Authentication router for TrendVest — JWT-based email/password auth.
 """
 import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from fastapi import APIRouter, Depends, HTTPException
+import asyncpg
+from fastapi import APIRouter, HTTPException
 from passlib.context import CryptContext
-from jose import jwt, JWTError
+from cachetools import TLRUCache, TTLCache
+import jwt
+from jwt import InvalidTokenError as JWTError
 
 from ..models.schemas import RegisterRequest, LoginRequest, TokenResponse, UserProfile
-from ..deps import get_db_pool
+from ..deps import DbPool
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use argon2; existing bcrypt hashes still verify and are upgraded on login
+pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto", bcrypt__rounds=12)
+
+# argon2-cffi releases the GIL while hashing, so these threads genuinely run in parallel
+_hash_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="pwd-hash")
+
+
+async def _run_hash(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
 
 JWT_SECRET = os.getenv("JWT_SECRET_KEY", "trendvest-dev-secret-change-in-production")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+# Encode the key once and reuse one PyJWT instance rather than redoing both per call
+_SIGNING_KEY = JWT_SECRET.encode()
+_jwt = jwt.PyJWT()
+
+USER_BY_EMAIL_SQL = "SELECT id, password_hash FROM users WHERE email = $1"
+USER_EXISTS_SQL = "SELECT id FROM users WHERE id = $1::uuid"
+INSERT_USER_SQL = """
+    INSERT INTO users (email, password_hash, display_name)
+    VALUES ($1, $2, $3)
+    RETURNING id
+"""
+USER_PROFILE_SQL = "SELECT id, email, display_name, tier, created_at FROM users WHERE id = $1::uuid"
+
+
+# Decoded access tokens, kept until min(60s, token expiry). Only touched from the
+# event loop thread, so no lock is needed.
+_TOKEN_CACHE_TTL = 60
+
+
+def _token_ttu(_token, payload, now):
+    return now + min(_TOKEN_CACHE_TTL, payload.get("exp", 0) - time.time())
+
+
+_token_cache = TLRUCache(maxsize=10000, ttu=_token_ttu)
+_profile_cache = TTLCache(maxsize=10000, ttl=30)
+
 
 def create_token(data: dict, expires_delta: timedelta) -> str:
     to_encode = data.copy()
     to_encode["exp"] = datetime.now(timezone.utc) + expires_delta
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return _jwt.encode(to_encode, _SIGNING_KEY, algorithm=JWT_ALGORITHM)
 
 
-@router.post("/register", response_model=TokenResponse)
-async def register(body: RegisterRequest, pool=Depends(get_db_pool)):
-    """Create a new account."""
-    async with pool.acquire() as conn:
-        existing = await conn.fetchval("SELECT id FROM users WHERE email = $1", body.email.lower())
-        if existing:
-            raise HTTPException(status_code=409, detail="Email already registered")
+def decode_token(token: str) -> dict:
+    return _jwt.decode(token, _SIGNING_KEY, algorithms=[JWT_ALGORITHM])
+
+
+def create_token_pair(user_id: str) -> TokenResponse:
+    return TokenResponse(
+        access_token=create_token({"sub": user_id, "type": "access"}, timedelta(minutes=ACCESS_TOKEN_EXPIRE)),
+        refresh_token=create_token({"sub": user_id, "type": "refresh"}, timedelta(days=REFRESH_TOKEN_EXPIRE)),
+    )
 
-        password_hash = pwd_context.hash(body.password)
-        user_id = await conn.fetchval("""
-            INSERT INTO users (email, password_hash, display_name)
-            VALUES ($1, $2, $3)
-            RETURNING id
-        """, body.email.lower(), password_hash, body.display_name or body.email.split("@")[0])
 
-    access_token = create_token({"sub": str(user_id), "type": "access"}, timedelta(minutes=ACCESS_TOKEN_EXPIRE))
-    refresh_token = create_token({"sub": str(user_id), "type": "refresh"}, timedelta(days=REFRESH_TOKEN_EXPIRE))
+@router.post("/register", response_model=TokenResponse)
+async def register(body: RegisterRequest, pool: DbPool):
+    """Create a new account."""
+    # Hash before taking a connection, so a slow KDF doesn't pin one from the pool;
+    # the email's unique constraint catches duplicates
+    password_hash = await _run_hash(pwd_context.hash, body.password)
+    try:
+        async with pool.acquire() as conn:
+            user_id = await conn.fetchval(
+                INSERT_USER_SQL,
+                body.email.lower(), password_hash, body.display_name or body.email.split("@")[0],
+            )
+    except asyncpg.UniqueViolationError:
+        raise HTTPException(status_code=409, detail="Email already registered")
 
-    return TokenResponse(access_token=access_token, refresh_token=refresh_token)
+    return create_token_pair(str(user_id))
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(body: LoginRequest, pool=Depends(get_db_pool)):
+async def login(body: LoginRequest, pool: DbPool):
     """Login with email and password."""
     async with pool.acquire() as conn:
-        user = await conn.fetchrow(
-            "SELECT id, password_hash FROM users WHERE email = $1",
-            body.email.lower()
-        )
+        user = await conn.fetchrow(USER_BY_EMAIL_SQL, body.email.lower())
 
-    if not user or not pwd_context.verify(body.password, user["password_hash"]):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    verified, new_hash = await _run_hash(pwd_context.verify_and_update, body.password, user["password_hash"])
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        async with pool.acquire() as conn:
+            await conn.execute("UPDATE users SET password_hash = $1 WHERE id = $2", new_hash, user["id"])
 
-    access_token = create_token({"sub": str(user["id"]), "type": "access"}, timedelta(minutes=ACCESS_TOKEN_EXPIRE))
-    refresh_token = create_token({"sub": str(user["id"]), "type": "refresh"}, timedelta(days=REFRESH_TOKEN_EXPIRE))
-
-    return TokenResponse(access_token=access_token, refresh_token=refresh_token)
+    return create_token_pair(str(user["id"]))
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(refresh_token: str, pool=Depends(get_db_pool)):
+async def refresh_token(refresh_token: str, pool: DbPool):
     """Refresh an expired access token."""
     try:
-        payload = jwt.decode(refresh_token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(refresh_token)
         if payload.get("type") != "refresh":
             raise HTTPException(status_code=401, detail="Invalid token type")
         user_id = payload.get("sub")
@@ -77,39 +125,39 @@ async def refresh_token(refresh_token: str, pool=Depends(get_db_pool)):
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
     async with pool.acquire() as conn:
-        user = await conn.fetchrow("SELECT id FROM users WHERE id = $1::uuid", user_id)
+        user = await conn.fetchrow(USER_EXISTS_SQL, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    access_token = create_token({"sub": user_id, "type": "access"}, timedelta(minutes=ACCESS_TOKEN_EXPIRE))
-    new_refresh = create_token({"sub": user_id, "type": "refresh"}, timedelta(days=REFRESH_TOKEN_EXPIRE))
-
-    return TokenResponse(access_token=access_token, refresh_token=new_refresh)
+    return create_token_pair(user_id)
 
 
 @router.get("/me", response_model=UserProfile)
-async def get_me(token: str, pool=Depends(get_db_pool)):
+async def get_me(token: str, pool: DbPool):
     """Get current user profile from token."""
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        if payload.get("type") != "access":
-            raise HTTPException(status_code=401, detail="Invalid token type")
-        user_id = payload.get("sub")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-    async with pool.acquire() as conn:
-        user = await conn.fetchrow(
-            "SELECT id, email, display_name, tier, created_at FROM users WHERE id = $1::uuid",
-            user_id
+    payload = _token_cache.get(token)
+    if payload is None:
+        try:
+            payload = decode_token(token)
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        _token_cache[token] = payload
+    if payload.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    user_id = payload.get("sub")
+
+    profile = _profile_cache.get(user_id)
+    if profile is None:
+        async with pool.acquire() as conn:
+            user = await conn.fetchrow(USER_PROFILE_SQL, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        profile = _profile_cache[user_id] = UserProfile(
+            id=str(user["id"]),
+            email=user["email"],
+            display_name=user["display_name"] or "",
+            tier=user["tier"],
+            created_at=user["created_at"],
         )
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    return UserProfile(
-        id=str(user["id"]),
-        email=user["email"],
-        display_name=user["display_name"] or "",
-        tier=user["tier"],
-        created_at=user["created_at"],
-    )
+    return profile
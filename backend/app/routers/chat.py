@@ -1,26 +1,41 @@
 """
 Chat API endpoint for TrendVest AI Explainer.
 """
+import os
+
 from fastapi import APIRouter, Request, HTTPException
 from ..models.schemas import (
     ChatRequest, ChatResponse,
     ExplainTermRequest, ExplainTermResponse,
     ExplainSectionRequest, ExplainSectionResponse,
 )
-from ..services.ai_explainer import AIExplainer
+from ..services.ai_explainer import explainer
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
-explainer = AIExplainer()
+# Reverse proxies whose X-Forwarded-For header we believe
+TRUSTED_PROXIES = frozenset(
+    p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()
+)
+
+
+def _client_id(request: Request) -> str:
+    """Caller IP, taken from the first X-Forwarded-For hop when sent by a trusted proxy."""
+    peer = request.client.host if request.client else "unknown"
+    if peer in TRUSTED_PROXIES:
+        forwarded = request.headers.get("x-forwarded-for", "")
+        first_hop = forwarded.split(",", 1)[0].strip()
+        if first_hop:
+            return first_hop
+    return peer
 
 
 @router.post("", response_model=ChatResponse)
 async def ask_ai(request: Request, body: ChatRequest):
     """Ask the AI explainer a financial question."""
-    client_ip = request.client.host if request.client else "unknown"
-    user_id = client_ip
+    user_id = _client_id(request)
 
-    allowed, remaining = explainer.check_rate_limit(user_id)
+    allowed, remaining = await explainer.consume_question(user_id)
     if not allowed:
         raise HTTPException(
             status_code=429,
@@ -34,22 +49,20 @@ async def ask_ai(request: Request, body: ChatRequest):
     result = await explainer.ask(
         question=body.question,
         context=body.context,
-        user_id=user_id,
         language=body.language,
     )
 
     return ChatResponse(
         answer=result["answer"],
         suggested_questions=result["suggested_questions"],
-        questions_remaining=result["questions_remaining"],
+        questions_remaining=remaining,
     )
 
 
 @router.get("/remaining")
 async def get_remaining(request: Request):
     """Check how many questions the user has left today."""
-    client_ip = request.client.host if request.client else "unknown"
-    _, remaining = explainer.check_rate_limit(client_ip)
+    remaining = await explainer.questions_remaining(_client_id(request))
     return {"remaining": remaining, "daily_limit": explainer.free_daily_limit}
 
 
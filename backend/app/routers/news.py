@@ -5,68 +5,127 @@ and Google Trends related queries.
 import os
 import json
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Response
 from typing import Optional
 
+import orjson
+from cachetools import TTLCache
+
+from ..services.cache import SingleFlight, shared_cache
+from ..services.http_client import get_http_client
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
 router = APIRouter(prefix="/api/news", tags=["news"])
 
-# Simple cache
-_news_cache: dict[str, dict] = {}
-CACHE_TTL = 900  # 15 minutes
+CACHE_TTL = 900  # 15 minutes — entries are fresh for this long
+STALE_TTL = 3600  # served (while refreshing in background) for up to an hour
+EMPTY_RETRY_TTL = 60  # an empty upstream result is retried soon instead of cached for 15 min
 
-# Load topics from JSON to build mappings dynamically
-_topics_data: list[dict] = []
+# Per-process cache (L1); shared_cache is the cross-worker tier (L2) when Redis is configured.
+# Values are {"body": serialized JSON bytes, "fresh_until": epoch seconds}, so a hit is
+# returned as-is with no re-encoding. Both tiers keep them until STALE_TTL.
+# Only touched from the event loop thread, so it needs no lock.
+_news_cache = TTLCache(maxsize=512, ttl=STALE_TTL, timer=time.monotonic)
+
+# Shared pool for blocking news fetches, so fan-outs don't build a pool per request
+_IO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="news-io")
+
+# Concurrent misses for the same feed share one upstream fetch
+_news_flight = SingleFlight()
+_background_refreshes: set[asyncio.Task] = set()
 
-def _load_topics():
-    global _topics_data
-    if _topics_data:
-        return _topics_data
+# yf.Ticker objects reused across feeds; a Ticker memoizes its news once fetched,
+# so entries expire to let fresh headlines through. Accessed from _IO_POOL threads.
+_TICKER_TTL = 300
+_ticker_cache = TTLCache(maxsize=256, ttl=_TICKER_TTL, timer=time.monotonic)
+_ticker_lock = threading.Lock()
+
+# Per-source results, shared by every feed that fans out to the same ticker/query.
+# Stored without related_topic, which is filled in per caller.
+_SOURCE_TTL = 300
+_yf_news_cache = TTLCache(maxsize=256, ttl=_SOURCE_TTL, timer=time.monotonic)
+_yf_news_lock = threading.Lock()  # written from _IO_POOL threads
+_newsapi_cache = TTLCache(maxsize=256, ttl=_SOURCE_TTL, timer=time.monotonic)  # event loop only
+
+# Load topics from JSON to build mappings dynamically
+@functools.lru_cache(maxsize=1)
+def _load_topics() -> list[dict]:
     topics_file = Path(__file__).parent.parent / "data" / "topics.json"
     try:
         with open(topics_file, "r", encoding="utf-8") as f:
             data = json.load(f)
-        _topics_data = data.get("topics", [])
+        return data.get("topics", [])
     except Exception:
-        _topics_data = []
-    return _topics_data
+        return []
+
+
+# Slug lookups built once at import instead of scanning the topic list per request
+_TICKERS_BY_SLUG = {t["slug"]: [s["ticker"] for s in t.get("stocks", [])[:3]] for t in _load_topics()}
+_KEYWORDS_BY_SLUG = {t["slug"]: t.get("keywords", [])[:5] for t in _load_topics()}
+_NAME_BY_SLUG = {t["slug"]: t.get("name_en", t["slug"]) for t in _load_topics()}
+
+
+# General feed: one headline ticker per topic, kept as parallel symbol/slug arrays
+_FEATURED = (
+    ("NVDA", "ai"), ("TSLA", "ev"), ("MSFT", "ai"),
+    ("CCJ", "nuclear"), ("LLY", "glp1"), ("CRWD", "cyber"),
+    ("IONQ", "quantum"), ("COIN", "crypto"),
+)
+_FEATURED_SYMS, _FEATURED_SLUGS = zip(*_FEATURED)
 
 
 def _get_topic_tickers(slug: str) -> list[str]:
     """Get top tickers for a topic from topics.json."""
-    for topic in _load_topics():
-        if topic["slug"] == slug:
-            return [s["ticker"] for s in topic.get("stocks", [])[:3]]
-    return []
+    return _TICKERS_BY_SLUG.get(slug, [])
 
 
 def _get_topic_keywords(slug: str) -> list[str]:
     """Get keywords for a topic from topics.json."""
-    for topic in _load_topics():
-        if topic["slug"] == slug:
-            return topic.get("keywords", [])[:5]
-    return []
+    return _KEYWORDS_BY_SLUG.get(slug, [])
 
 
 def _get_topic_name(slug: str) -> str:
     """Get English name for a topic."""
-    for topic in _load_topics():
-        if topic["slug"] == slug:
-            return topic.get("name_en", slug)
-    return slug
+    return _NAME_BY_SLUG.get(slug, slug)
 
 
 def _get_all_topic_slugs() -> list[str]:
-    return [t["slug"] for t in _load_topics()]
+    return list(_NAME_BY_SLUG)
+
+
+def _get_ticker(ticker: str):
+    with _ticker_lock:
+        stock = _ticker_cache.get(ticker)
+        if stock is None:
+            stock = _ticker_cache[ticker] = yf.Ticker(ticker)
+    return stock
+
+
+def _with_topic(items: list[dict], topic_slug: str | None) -> list[dict]:
+    """Copy cached source items, tagging each with the caller's topic."""
+    return [{**item, "related_topic": topic_slug} for item in items]
 
 
 def _get_yfinance_news(ticker: str, topic_slug: str | None = None) -> list[dict]:
     """Get news for a specific stock from yfinance."""
+    if yf is None:
+        return []
+    with _yf_news_lock:
+        cached = _yf_news_cache.get(ticker)
+    if cached is not None:
+        return _with_topic(cached, topic_slug)
     try:
-        import yfinance as yf
-        stock = yf.Ticker(ticker)
+        stock = _get_ticker(ticker)
         news = stock.news or []
         results = []
         for item in news[:10]:
@@ -84,23 +143,27 @@ def _get_yfinance_news(ticker: str, topic_slug: str | None = None) -> list[dict]
                 "published_at": content.get("pubDate", ""),
                 "image_url": image_url,
                 "related_ticker": ticker,
-                "related_topic": topic_slug,
             })
-        return results
+        if results:
+            with _yf_news_lock:
+                _yf_news_cache[ticker] = results
+        return _with_topic(results, topic_slug)
     except Exception as e:
         print(f"yfinance news error for {ticker}: {e}")
         return []
 
 
-def _get_newsapi_articles(keywords: list[str], topic_slug: str | None = None) -> list[dict]:
+async def _get_newsapi_articles(keywords: list[str], topic_slug: str | None = None) -> list[dict]:
     """Get news from NewsAPI.org (requires NEWS_API_KEY in .env)."""
     api_key = os.getenv("NEWS_API_KEY", "")
     if not api_key:
         return []
+    query = " OR ".join(keywords[:3])
+    cached = _newsapi_cache.get(query)
+    if cached is not None:
+        return _with_topic(cached, topic_slug)
     try:
-        import requests
-        query = " OR ".join(keywords[:3])
-        resp = requests.get(
+        resp = await get_http_client().get(
             "https://newsapi.org/v2/everything",
             params={
                 "q": query,
@@ -109,7 +172,6 @@ def _get_newsapi_articles(keywords: list[str], topic_slug: str | None = None) ->
                 "language": "en",
                 "apiKey": api_key,
             },
-            timeout=10,
         )
         if resp.status_code != 200:
             return []
@@ -124,20 +186,23 @@ def _get_newsapi_articles(keywords: list[str], topic_slug: str | None = None) ->
                 "published_at": a.get("publishedAt", ""),
                 "image_url": a.get("urlToImage", "") or "",
                 "related_ticker": None,
-                "related_topic": topic_slug,
             })
-        return results
+        if results:
+            _newsapi_cache[query] = results
+        return _with_topic(results, topic_slug)
     except Exception as e:
         print(f"NewsAPI error: {e}")
         return []
 
 
-def _get_stock_news_combined(ticker: str, topic_slug: str | None = None) -> list[dict]:
+async def _get_stock_news_combined(ticker: str, topic_slug: str | None = None) -> list[dict]:
     """Try yfinance first, fall back to NewsAPI for a stock."""
-    results = _get_yfinance_news(ticker, topic_slug)
+    # yfinance is blocking — run it on the shared IO pool
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(_IO_POOL, _get_yfinance_news, ticker, topic_slug)
     if not results:
         # yfinance failed, try NewsAPI with the ticker as keyword
-        results = _get_newsapi_articles([ticker], topic_slug)
+        results = await _get_newsapi_articles([ticker], topic_slug)
     return results
 
 
@@ -193,6 +258,18 @@ def _get_google_trends_queries(keywords: list[str], topic_slug: str | None = Non
         return []
 
 
+async def _in_io_pool(fn, *args) -> list[dict]:
+    """Run a blocking source fetch (X, Google Trends) on the shared IO pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_POOL, fn, *args)
+
+
+async def _gather_news(*coros) -> list[dict]:
+    """Await news fetches concurrently and flatten the results, skipping failures."""
+    batches = await asyncio.gather(*coros, return_exceptions=True)
+    return [item for batch in batches if not isinstance(batch, BaseException) for item in batch]
+
+
 @router.get("")
 async def get_news(
     topic: Optional[str] = Query(None),
@@ -202,94 +279,134 @@ async def get_news(
 ):
     """Get latest news headlines. Filter by topic, ticker, or source type."""
     cache_key = f"{topic or ''}:{ticker or ''}:{source_type or ''}:{limit}"
-    now = time.time()
 
-    if cache_key in _news_cache:
-        cached = _news_cache[cache_key]
-        if now - cached["time"] < CACHE_TTL:
-            return cached["data"]
+    entry = _news_cache.get(cache_key)
+    checked_l2 = False
+    if entry is None and shared_cache.remote:
+        raw = await shared_cache.get(f"news:{cache_key}")
+        checked_l2 = True
+        if raw is not None:
+            entry = _news_cache[cache_key] = _unpack_entry(raw)
+
+    refresh = lambda: _fetch_news(cache_key, topic, ticker, source_type, limit)
+    if entry is None:
+        return _json_response(await _news_flight.do(cache_key, refresh))
+
+    if time.time() >= entry["fresh_until"]:
+        # Another worker may already have refreshed this feed
+        shared = None if checked_l2 else await _fresh_from_l2(cache_key)
+        if shared is not None:
+            return _json_response(shared["body"])
+        # Stale-while-revalidate: answer now, refresh once in the background
+        task = asyncio.create_task(_refresh_in_background(cache_key, refresh))
+        _background_refreshes.add(task)
+        task.add_done_callback(_background_refreshes.discard)
+    return _json_response(entry["body"])
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def _pack_entry(entry: dict) -> bytes:
+    """L2 wire format: the fresh_until timestamp line, then the JSON body untouched."""
+    return f"{entry['fresh_until']}\n".encode() + entry["body"]
+
+
+def _unpack_entry(raw: bytes) -> dict:
+    fresh_until, _, body = raw.partition(b"\n")
+    return {"body": body, "fresh_until": float(fresh_until)}
 
-    results = []
+
+async def _fresh_from_l2(cache_key: str) -> dict | None:
+    """Adopt L2's copy into L1 if it is still fresh, so only one worker refetches upstream."""
+    if not shared_cache.remote:
+        return None
+    raw = await shared_cache.get(f"news:{cache_key}")
+    if raw is None:
+        return None
+    entry = _unpack_entry(raw)
+    if time.time() >= entry["fresh_until"]:
+        return None
+    _news_cache[cache_key] = entry
+    return entry
+
+
+async def _refresh_in_background(cache_key: str, refresh):
+    try:
+        if await _fresh_from_l2(cache_key) is None:
+            await _news_flight.do(cache_key, refresh)
+    except Exception as e:
+        print(f"News refresh failed for {cache_key}: {e}")
+
+
+async def _fetch_news(cache_key: str, topic: str | None, ticker: str | None,
+                      source_type: str | None, limit: int) -> bytes:
+    """Build the feed from upstream sources, store it in both cache tiers and return the JSON body."""
+    fetches = []
 
     if ticker:
         # Single stock: get news + X tweets about that ticker
         if source_type in (None, "news"):
-            results.extend(_get_stock_news_combined(ticker.upper()))
+            fetches.append(_get_stock_news_combined(ticker.upper()))
         if source_type in (None, "x"):
-            results.extend(_get_x_tweets([ticker.upper()], max_results=5))
+            fetches.append(_in_io_pool(_get_x_tweets, [ticker.upper()], None, 5))
     elif topic:
         # Topic: use actual topic data from topics.json
         tickers = _get_topic_tickers(topic)
         keywords = _get_topic_keywords(topic)
 
         if source_type in (None, "news"):
-            # Try yfinance for stock-specific news — parallel
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                futures = [
-                    executor.submit(_get_stock_news_combined, t, topic_slug=topic)
-                    for t in tickers[:3]
-                ]
-                for future in as_completed(futures):
-                    try:
-                        results.extend(future.result())
-                    except Exception:
-                        pass
-            # Also try NewsAPI for broader topic news
+            # Stock-specific news in parallel with NewsAPI for broader topic news
+            fetches.extend(_get_stock_news_combined(t, topic_slug=topic) for t in tickers[:3])
             if keywords:
-                results.extend(_get_newsapi_articles(keywords, topic_slug=topic))
+                fetches.append(_get_newsapi_articles(keywords, topic_slug=topic))
         if source_type in (None, "x") and keywords:
-            results.extend(_get_x_tweets(keywords[:3], topic_slug=topic, max_results=5))
+            fetches.append(_in_io_pool(_get_x_tweets, keywords[:3], topic, 5))
         if source_type in (None, "google_trends") and keywords:
-            results.extend(_get_google_trends_queries(keywords, topic_slug=topic))
+            fetches.append(_in_io_pool(_get_google_trends_queries, keywords, topic))
     else:
         # General feed: mix news from multiple topics for variety
         if source_type in (None, "news"):
-            # Get news from top tickers across different topics — parallel
-            featured_tickers = [
-                ("NVDA", "ai"), ("TSLA", "ev"), ("MSFT", "ai"),
-                ("CCJ", "nuclear"), ("LLY", "glp1"), ("CRWD", "cyber"),
-                ("IONQ", "quantum"), ("COIN", "crypto"),
-            ]
-            with ThreadPoolExecutor(max_workers=8) as executor:
-                futures = {
-                    executor.submit(_get_stock_news_combined, t, topic_slug=s): t
-                    for t, s in featured_tickers
-                }
-                for future in as_completed(futures):
-                    try:
-                        results.extend(future.result())
-                    except Exception:
-                        pass
+            # Get news from top tickers across different topics
+            fetches.extend(
+                _get_stock_news_combined(t, topic_slug=s) for t, s in zip(_FEATURED_SYMS, _FEATURED_SLUGS)
+            )
             # Broad market news via NewsAPI
-            results.extend(_get_newsapi_articles(["stock market", "investing", "wall street"]))
+            fetches.append(_get_newsapi_articles(["stock market", "investing", "wall street"]))
 
         if source_type in (None, "x"):
             # Get tweets about specific trending topics, not generic "stocks"
-            results.extend(_get_x_tweets(
-                ["artificial intelligence stocks", "NVDA", "Tesla"],
-                topic_slug="ai", max_results=3
-            ))
-            results.extend(_get_x_tweets(
-                ["nuclear energy", "uranium"],
-                topic_slug="nuclear", max_results=3
+            fetches.append(_in_io_pool(
+                _get_x_tweets, ["artificial intelligence stocks", "NVDA", "Tesla"], "ai", 3
             ))
+            fetches.append(_in_io_pool(_get_x_tweets, ["nuclear energy", "uranium"], "nuclear", 3))
 
         if source_type in (None, "google_trends"):
             # Get trends for specific topics, not generic "stock market"
             for slug in ["ai", "nuclear", "ev"]:
                 kw = _get_topic_keywords(slug)
                 if kw:
-                    results.extend(_get_google_trends_queries(kw, topic_slug=slug))
+                    fetches.append(_in_io_pool(_get_google_trends_queries, kw, slug))
 
-    # Deduplicate by title
-    seen_titles = set()
-    unique = []
-    for item in results:
-        if item["title"] and item["title"] not in seen_titles:
-            seen_titles.add(item["title"])
-            unique.append(item)
+    # Every source runs concurrently; results keep the order above
+    results = await _gather_news(*fetches)
 
-    unique = unique[:limit]
+    # Deduplicate by title, keeping the first occurrence (dicts preserve insertion order)
+    by_title = {}
+    for item in results:
+        if item["title"]:
+            by_title.setdefault(item["title"], item)
+    unique = list(by_title.values())[:limit]
 
-    _news_cache[cache_key] = {"time": now, "data": unique}
-    return unique
+    now = time.time()
+    entry = {"body": orjson.dumps(unique), "fresh_until": now + CACHE_TTL}
+    if not unique:
+        # Upstream came back empty — keep serving what we had and retry shortly
+        previous = _news_cache.get(cache_key)
+        entry = {"body": previous["body"] if previous else b"[]", "fresh_until": now + EMPTY_RETRY_TTL}
+
+    _news_cache[cache_key] = entry
+    if shared_cache.remote:
+        await shared_cache.set(f"news:{cache_key}", _pack_entry(entry), STALE_TTL)
+    return entry["body"]
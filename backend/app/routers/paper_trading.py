@@ -1,108 +1,122 @@
 """
 Paper trading (demo/practice) router for TrendVest.
 """
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException
 from ..models.schemas import TradeRequest, PortfolioResponse, HoldingResponse, TradeHistoryItem
-from ..deps import get_db_pool, get_stock_service
+from ..deps import DbPool, StockService
 
 router = APIRouter(prefix="/api/paper", tags=["paper-trading"])
 
 STARTING_BALANCE = 100000.0
 
+# Sessions whose portfolio row is known to exist, so repeat trades skip the upsert
+_known_sessions = TTLCache(maxsize=10000, ttl=3600)
+# Tickers each session held last time, used to prefetch prices while holdings load
+_last_tickers = TTLCache(maxsize=10000, ttl=3600)
+
+
+ENSURE_PORTFOLIO_SQL = """
+    INSERT INTO paper_portfolios (session_id, cash_balance)
+    VALUES ($1, $2)
+    ON CONFLICT (session_id) DO NOTHING
+"""
+CASH_SQL = "SELECT cash_balance FROM paper_portfolios WHERE session_id = $1"
+HOLDINGS_SQL = "SELECT ticker, quantity, avg_cost FROM paper_holdings WHERE session_id = $1"
+HISTORY_SQL = """
+    SELECT ticker, action, quantity, price, total, executed_at
+    FROM paper_trades
+    WHERE session_id = $1
+    ORDER BY executed_at DESC
+    LIMIT $2
+"""
+
 
 async def ensure_portfolio(conn, session_id: str):
     """Create portfolio if it doesn't exist."""
-    await conn.execute("""
-        INSERT INTO paper_portfolios (session_id, cash_balance)
-        VALUES ($1, $2)
-        ON CONFLICT (session_id) DO NOTHING
-    """, session_id, STARTING_BALANCE)
+    if session_id in _known_sessions:
+        return
+    await conn.execute(ENSURE_PORTFOLIO_SQL, session_id, STARTING_BALANCE)
+
+
+# Each trade is one statement: the cash/holding checks live in the WHERE clauses,
+# and the trade row is only logged when the guarded update matched.
+BUY_SQL = """
+    WITH bal AS (
+        UPDATE paper_portfolios SET cash_balance = cash_balance - $3::float8
+        WHERE session_id = $1 AND cash_balance >= $3::float8
+        RETURNING session_id
+    ), holding AS (
+        INSERT INTO paper_holdings (session_id, ticker, quantity, avg_cost)
+        SELECT $1, $2, $4::int, $5::float8 FROM bal
+        ON CONFLICT (session_id, ticker) DO UPDATE SET
+            quantity = paper_holdings.quantity + EXCLUDED.quantity,
+            avg_cost = (paper_holdings.avg_cost * paper_holdings.quantity + $3::float8)
+                       / (paper_holdings.quantity + EXCLUDED.quantity)
+    ), trade AS (
+        INSERT INTO paper_trades (session_id, ticker, action, quantity, price, total)
+        SELECT $1, $2, 'buy', $4::int, $5::float8, $3::float8 FROM bal
+    )
+    SELECT EXISTS (SELECT 1 FROM bal) AS executed,
+           (SELECT cash_balance FROM paper_portfolios WHERE session_id = $1) AS cash
+"""
+
+SELL_SQL = """
+    WITH sold_out AS (
+        DELETE FROM paper_holdings
+        WHERE session_id = $1 AND ticker = $2 AND quantity = $3::int
+        RETURNING session_id
+    ), reduced AS (
+        UPDATE paper_holdings SET quantity = quantity - $3::int
+        WHERE session_id = $1 AND ticker = $2 AND quantity > $3::int
+        RETURNING session_id
+    ), sold AS (
+        SELECT session_id FROM sold_out UNION ALL SELECT session_id FROM reduced
+    ), bal AS (
+        UPDATE paper_portfolios SET cash_balance = cash_balance + $4::float8
+        WHERE session_id IN (SELECT session_id FROM sold)
+    ), trade AS (
+        INSERT INTO paper_trades (session_id, ticker, action, quantity, price, total)
+        SELECT $1, $2, 'sell', $3::int, $5::float8, $4::float8 FROM sold
+    )
+    SELECT EXISTS (SELECT 1 FROM sold)
+"""
 
 
 @router.post("/trade")
 async def execute_trade(
     body: TradeRequest,
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
+    pool: DbPool,
+    stock_service: StockService,
 ):
     """Execute a paper trade (buy or sell)."""
     ticker = body.ticker.upper()
 
-    # Get current price
-    price_data = stock_service.get_price(ticker)
+    # Get current price (may hit yfinance, so keep it off the event loop)
+    price_data = await asyncio.to_thread(stock_service.get_price, ticker)
     if not price_data or not price_data.price:
         raise HTTPException(status_code=400, detail=f"Could not get price for {ticker}")
 
     price = price_data.price
     total = price * body.quantity
 
-    async with pool.acquire() as conn:
+    async with pool.acquire() as conn, conn.transaction():
         await ensure_portfolio(conn, body.session_id)
 
         if body.action == "buy":
-            # Check cash balance
-            cash = await conn.fetchval(
-                "SELECT cash_balance FROM paper_portfolios WHERE session_id = $1",
-                body.session_id
-            )
-            if cash < total:
-                raise HTTPException(status_code=400, detail=f"Insufficient funds. Need ${total:.2f}, have ${cash:.2f}")
-
-            # Deduct cash
-            await conn.execute(
-                "UPDATE paper_portfolios SET cash_balance = cash_balance - $1 WHERE session_id = $2",
-                total, body.session_id
-            )
-
-            # Update holdings
-            existing = await conn.fetchrow(
-                "SELECT quantity, avg_cost FROM paper_holdings WHERE session_id = $1 AND ticker = $2",
-                body.session_id, ticker
-            )
-            if existing:
-                new_qty = existing["quantity"] + body.quantity
-                new_avg = ((existing["avg_cost"] * existing["quantity"]) + total) / new_qty
-                await conn.execute(
-                    "UPDATE paper_holdings SET quantity = $1, avg_cost = $2 WHERE session_id = $3 AND ticker = $4",
-                    new_qty, new_avg, body.session_id, ticker
-                )
-            else:
-                await conn.execute(
-                    "INSERT INTO paper_holdings (session_id, ticker, quantity, avg_cost) VALUES ($1, $2, $3, $4)",
-                    body.session_id, ticker, body.quantity, price
-                )
+            row = await conn.fetchrow(BUY_SQL, body.session_id, ticker, total, body.quantity, price)
+            if not row["executed"]:
+                raise HTTPException(status_code=400, detail=f"Insufficient funds. Need ${total:.2f}, have ${row['cash']:.2f}")
 
         elif body.action == "sell":
-            existing = await conn.fetchrow(
-                "SELECT quantity FROM paper_holdings WHERE session_id = $1 AND ticker = $2",
-                body.session_id, ticker
-            )
-            if not existing or existing["quantity"] < body.quantity:
+            executed = await conn.fetchval(SELL_SQL, body.session_id, ticker, body.quantity, total, price)
+            if not executed:
                 raise HTTPException(status_code=400, detail=f"Not enough shares of {ticker} to sell")
 
-            new_qty = existing["quantity"] - body.quantity
-            if new_qty == 0:
-                await conn.execute(
-                    "DELETE FROM paper_holdings WHERE session_id = $1 AND ticker = $2",
-                    body.session_id, ticker
-                )
-            else:
-                await conn.execute(
-                    "UPDATE paper_holdings SET quantity = $1 WHERE session_id = $2 AND ticker = $3",
-                    new_qty, body.session_id, ticker
-                )
-
-            # Add cash
-            await conn.execute(
-                "UPDATE paper_portfolios SET cash_balance = cash_balance + $1 WHERE session_id = $2",
-                total, body.session_id
-            )
-
-        # Record trade
-        await conn.execute("""
-            INSERT INTO paper_trades (session_id, ticker, action, quantity, price, total)
-            VALUES ($1, $2, $3, $4, $5, $6)
-        """, body.session_id, ticker, body.action, body.quantity, price, total)
+    # Only after commit: a rolled-back trade also rolls back a fresh portfolio row
+    _known_sessions[body.session_id] = True
 
     return {
         "status": "executed",
@@ -117,26 +131,38 @@ async def execute_trade(
 @router.get("/portfolio/{session_id}", response_model=PortfolioResponse)
 async def get_portfolio(
     session_id: str,
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
+    pool: DbPool,
+    stock_service: StockService,
 ):
     """Get portfolio state with current prices."""
-    async with pool.acquire() as conn:
-        await ensure_portfolio(conn, session_id)
-
-        cash = await conn.fetchval(
-            "SELECT cash_balance FROM paper_portfolios WHERE session_id = $1",
-            session_id
-        )
-
-        holdings_rows = await conn.fetch(
-            "SELECT ticker, quantity, avg_cost FROM paper_holdings WHERE session_id = $1",
-            session_id
-        )
+    # Holdings change slowly, so start on last time's prices while the DB query runs
+    expected = _last_tickers.get(session_id, ())
+    price_task = (
+        asyncio.create_task(asyncio.to_thread(stock_service.get_prices_batch, list(expected)))
+        if expected else None
+    )
 
-    # Get current prices
+    try:
+        async with pool.acquire() as conn:
+            cash = await conn.fetchval(CASH_SQL, session_id)
+            if cash is None:
+                # No trades yet; the row is created on the first trade, not on reads
+                cash = STARTING_BALANCE
+
+            holdings_rows = await conn.fetch(HOLDINGS_SQL, session_id)
+    except BaseException:
+        # Don't leave the prefetch behind unawaited if the DB read fails or is cancelled
+        if price_task:
+            price_task.cancel()
+        raise
+
+    # Get current prices, fetching only what the prefetch didn't cover
     tickers = [h["ticker"] for h in holdings_rows]
-    prices = stock_service.get_prices_batch(tickers) if tickers else {}
+    prices = await price_task if price_task else {}
+    missing = [t for t in tickers if t not in expected]
+    if missing:
+        prices.update(await asyncio.to_thread(stock_service.get_prices_batch, missing))
+    _last_tickers[session_id] = tuple(tickers)
 
     holdings = []
     total_market_value = 0
@@ -178,18 +204,12 @@ async def get_portfolio(
 @router.get("/history/{session_id}", response_model=list[TradeHistoryItem])
 async def get_trade_history(
     session_id: str,
+    pool: DbPool,
     limit: int = 50,
-    pool=Depends(get_db_pool),
 ):
     """Get trade history for a session."""
     async with pool.acquire() as conn:
-        trades = await conn.fetch("""
-            SELECT ticker, action, quantity, price, total, executed_at
-            FROM paper_trades
-            WHERE session_id = $1
-            ORDER BY executed_at DESC
-            LIMIT $2
-        """, session_id, limit)
+        trades = await conn.fetch(HISTORY_SQL, session_id, limit)
 
     return [
         TradeHistoryItem(
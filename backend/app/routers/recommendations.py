@@ -1,11 +1,13 @@
 """
 User tracking and recommendations router for TrendVest.
 """
-import json
-from fastapi import APIRouter, Depends, Query
+import time
+from cachetools import TTLCache
+from fastapi import APIRouter, Query
 from typing import Optional
 from ..models.schemas import TrackRequest
-from ..deps import get_db_pool
+from ..deps import DbPool
+from ..services.interactions import interaction_log
 
 router = APIRouter(prefix="/api", tags=["recommendations"])
 
@@ -19,102 +21,87 @@ SCORE_WEIGHTS = {
     "search": 0.5,
 }
 
+# Same weights as a SQL expression, so scoring happens in the aggregate
+_SCORE_CASE = "CASE interaction_type {} ELSE 1.0 END".format(
+    " ".join(f"WHEN '{kind}' THEN {weight}" for kind, weight in SCORE_WEIGHTS.items())
+)
+
+
+# ── Queries (asyncpg prepares each once per pooled connection) ──
+
+# Score the user's interactions and join topic details in one round trip
+RECOMMENDED_SQL = f"""
+    WITH s AS (
+        SELECT target_slug AS slug, SUM({_SCORE_CASE})::float8 AS score
+        FROM user_interactions
+        WHERE session_id = $1 AND target_slug IS NOT NULL
+        GROUP BY target_slug
+    )
+    SELECT t.slug, t.name_en, t.name_he, t.sector_en,
+           COALESCE(m.score, 0) as momentum_score,
+           COALESCE(m.direction, 'stable') as direction,
+           ROUND(s.score::numeric, 1)::float8 as interest_score
+    FROM s
+    JOIN topics t ON t.slug = s.slug AND t.is_active = true
+    LEFT JOIN momentum_scores m ON t.id = m.topic_id
+    ORDER BY s.score DESC
+    LIMIT $2
+"""
+
+# Anonymous default, and the fallback for sessions with no scored interactions
+POPULAR_TOPICS_SQL = """
+    SELECT t.slug, t.name_en, t.name_he, t.sector_en,
+           COALESCE(m.score, 0) as momentum_score,
+           COALESCE(m.direction, 'stable') as direction
+    FROM topics t
+    LEFT JOIN momentum_scores m ON t.id = m.topic_id
+    WHERE t.is_active = true
+    ORDER BY COALESCE(m.score, 0) DESC
+    LIMIT $1
+"""
+
+# Popular topics are the same for every anonymous caller, so share them briefly
+POPULAR_TTL = 30
+_popular_cache = TTLCache(maxsize=32, ttl=POPULAR_TTL, timer=time.monotonic)
+
+
+async def _popular_topics(pool, limit: int) -> list[dict]:
+    """Active topics ranked by momentum, cached per limit."""
+    topics = _popular_cache.get(limit)
+    if topics is None:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(POPULAR_TOPICS_SQL, limit)
+        topics = [dict(t) for t in rows]
+        _popular_cache[limit] = topics
+    return topics
+
 
 @router.post("/track")
 async def track_interaction(
     body: TrackRequest,
-    session_id: Optional[str] = Query(None),
-    pool=Depends(get_db_pool),
+    session_id: Optional[str] = Query(None, max_length=64),
 ):
     """Log a user interaction (fire-and-forget from frontend)."""
-    async with pool.acquire() as conn:
-        await conn.execute("""
-            INSERT INTO user_interactions (session_id, interaction_type, target_slug, metadata)
-            VALUES ($1, $2, $3, $4)
-        """, session_id, body.interaction_type,
-           body.target_slug,
-           json.dumps(body.metadata) if body.metadata else None)
-
-        # Update interest score if there's a target slug
-        if body.target_slug and session_id:
-            weight = SCORE_WEIGHTS.get(body.interaction_type, 1.0)
-            # We use session_id as a pseudo-user for anonymous users
-            # In a real app, this would be user_id from JWT
-            # For now, just log it
+    # Queued and written in batches; interest scores are computed at read time
+    interaction_log.record(session_id, body.interaction_type, body.target_slug, body.metadata)
     return {"status": "tracked"}
 
 
 @router.get("/recommendations")
 async def get_recommendations(
+    pool: DbPool,
     session_id: Optional[str] = Query(None),
     limit: int = Query(5, le=20),
-    pool=Depends(get_db_pool),
 ):
     """Get personalized topic recommendations based on user interactions."""
     if not session_id:
-        # Return default popular topics
-        async with pool.acquire() as conn:
-            topics = await conn.fetch("""
-                SELECT t.slug, t.name_en, t.name_he, t.sector_en,
-                       COALESCE(m.score, 0) as momentum_score,
-                       COALESCE(m.direction, 'stable') as direction
-                FROM topics t
-                LEFT JOIN momentum_scores m ON t.id = m.topic_id
-                WHERE t.is_active = true
-                ORDER BY COALESCE(m.score, 0) DESC
-                LIMIT $1
-            """, limit)
-        return [dict(t) for t in topics]
+        return await _popular_topics(pool, limit)
 
     async with pool.acquire() as conn:
-        # Get user's most interacted-with topics
-        interactions = await conn.fetch("""
-            SELECT target_slug, interaction_type, COUNT(*) as cnt
-            FROM user_interactions
-            WHERE session_id = $1 AND target_slug IS NOT NULL
-            GROUP BY target_slug, interaction_type
-        """, session_id)
-
-        # Calculate scores
-        scores: dict[str, float] = {}
-        for row in interactions:
-            slug = row["target_slug"]
-            weight = SCORE_WEIGHTS.get(row["interaction_type"], 1.0)
-            scores[slug] = scores.get(slug, 0) + weight * row["cnt"]
-
-        if not scores:
-            # Fallback to popular topics
-            topics = await conn.fetch("""
-                SELECT t.slug, t.name_en, t.name_he, t.sector_en,
-                       COALESCE(m.score, 0) as momentum_score,
-                       COALESCE(m.direction, 'stable') as direction
-                FROM topics t
-                LEFT JOIN momentum_scores m ON t.id = m.topic_id
-                WHERE t.is_active = true
-                ORDER BY COALESCE(m.score, 0) DESC
-                LIMIT $1
-            """, limit)
-            return [dict(t) for t in topics]
-
-        # Sort by interest score and get topic details
-        sorted_slugs = sorted(scores.keys(), key=lambda s: scores[s], reverse=True)[:limit]
-
-        topics = await conn.fetch("""
-            SELECT t.slug, t.name_en, t.name_he, t.sector_en,
-                   COALESCE(m.score, 0) as momentum_score,
-                   COALESCE(m.direction, 'stable') as direction
-            FROM topics t
-            LEFT JOIN momentum_scores m ON t.id = m.topic_id
-            WHERE t.slug = ANY($1) AND t.is_active = true
-        """, sorted_slugs)
-
-        # Preserve score order
-        topic_map = {t["slug"]: dict(t) for t in topics}
-        result = []
-        for slug in sorted_slugs:
-            if slug in topic_map:
-                t = topic_map[slug]
-                t["interest_score"] = round(scores[slug], 1)
-                result.append(t)
-
-        return result
+        topics = await conn.fetch(RECOMMENDED_SQL, session_id, limit)
+
+    if not topics:
+        # Fallback to popular topics
+        return await _popular_topics(pool, limit)
+
+    return [dict(t) for t in topics]
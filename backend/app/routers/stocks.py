@@ -1,20 +1,171 @@
 """
 Stocks API endpoints for TrendVest — search, screener, prices, history, profile, peers, research.
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+import asyncio
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import ORJSONResponse
 from typing import Optional
 from datetime import datetime, timezone
 from ..models.schemas import StockDetail, StockProfileResponse, CompanyOfficer, PeerStock, ResearchResponse
-from ..deps import get_db_pool, get_stock_service
-from ..services.ai_explainer import AIExplainer
-
-_explainer = AIExplainer()
+from ..models.database import save_last_prices
+from ..deps import DbPool, StockService
+from ..services.ai_explainer import explainer
+from ..services.stocks import StockPrice
+from ..services.yfinance_cache import get_info
+from ..services.http_client import get_http_client
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
 
 router = APIRouter(prefix="/api/stocks", tags=["stocks"])
 
+# Last persisted price columns, selected alongside topic_stocks via LEFT JOIN stock_prices sp
+PRICE_COLUMNS = """sp.price, sp.change, sp.change_pct, sp.previous_close,
+                   sp.updated_at AS price_updated_at"""
+
+
+async def _resolve_prices(pool, rows, stock_service, refresh: bool = True) -> dict[str, StockPrice]:
+    """Prices for rows carrying PRICE_COLUMNS; only stale or missing tickers are fetched live.
+    With refresh=False the stored prices are used as they are, however old."""
+    now = datetime.now(timezone.utc)
+    prices: dict[str, StockPrice] = {}
+    stale: dict[str, None] = {}  # ordered set; a ticker can appear on several rows
+    for r in rows:
+        ticker = r["ticker"]
+        updated_at = r["price_updated_at"]
+        if updated_at and (not refresh or (now - updated_at).total_seconds() < stock_service.CACHE_TTL):
+            prices[ticker] = StockPrice(
+                ticker=ticker,
+                price=r["price"],
+                change=r["change"],
+                change_pct=r["change_pct"],
+                previous_close=r["previous_close"],
+                fetched_at=updated_at,
+            )
+        else:
+            stale[ticker] = None
+
+    if stale and refresh:
+        prices.update(await _refresh_prices(pool, list(stale), stock_service))
+    return prices
+
+
+async def _refresh_prices(pool, tickers: list[str], stock_service) -> dict[str, StockPrice]:
+    """Fetch live prices and write them back to stock_prices."""
+    fetched = await asyncio.to_thread(stock_service.get_prices_batch, tickers)
+    # Write back so other workers read these from the join instead of refetching
+    await save_last_prices(pool, [p for p in fetched.values() if p])
+    return fetched
+
+
+# ORDER BY for each screener sort_by value (validated by the Query pattern)
+SCREENER_ORDER = {
+    "change": "COALESCE(s.change_pct, 0) DESC",
+    "price": "COALESCE(s.price, 999999)",
+    "name": "s.ticker",
+}
+
+
+# ── Queries (asyncpg prepares each once per pooled connection) ──
+
+# One statement per sort order, so every variant stays a fixed, preparable string
+SCREENER_SQL = {
+    sort_by: f"""
+    SELECT * FROM (
+        SELECT DISTINCT ON (ts.ticker)
+               ts.ticker, ts.company_name, ts.relevance_note, ts.priority,
+               t.sector, t.name_he as topic, t.slug as topic_slug,
+               {PRICE_COLUMNS}
+        FROM topic_stocks ts
+        JOIN topics t ON ts.topic_id = t.id
+        LEFT JOIN stock_prices sp ON sp.ticker = ts.ticker
+        WHERE t.is_active = true
+          AND ($1::text IS NULL OR t.sector = $1 OR t.sector_en = $1)
+          AND ($2::text IS NULL OR t.slug = $2)
+          AND ($3::text IS NULL OR ts.ticker ILIKE $3 OR ts.company_name ILIKE $3)
+          AND ($4::float8 IS NULL OR sp.price IS NULL OR sp.price >= $4)
+          AND ($5::float8 IS NULL OR sp.price IS NULL OR sp.price <= $5)
+        ORDER BY ts.ticker, ts.priority
+    ) s
+    ORDER BY {order}, s.priority, s.ticker
+    LIMIT $6 OFFSET $7
+"""
+    for sort_by, order in SCREENER_ORDER.items()
+}
+
+# Tickers the screener could return whose stored price is missing or older than $4 seconds
+STALE_SCREENER_SQL = """
+    SELECT DISTINCT ts.ticker
+    FROM topic_stocks ts
+    JOIN topics t ON ts.topic_id = t.id
+    LEFT JOIN stock_prices sp ON sp.ticker = ts.ticker
+    WHERE t.is_active = true
+      AND ($1::text IS NULL OR t.sector = $1 OR t.sector_en = $1)
+      AND ($2::text IS NULL OR t.slug = $2)
+      AND ($3::text IS NULL OR ts.ticker ILIKE $3 OR ts.company_name ILIKE $3)
+      AND (sp.updated_at IS NULL OR sp.updated_at < now() - make_interval(secs => $4))
+"""
+
+STOCK_SQL = f"""
+    SELECT ts.ticker, ts.company_name, ts.relevance_note,
+           t.sector, t.name_he as topic, t.slug as topic_slug,
+           {PRICE_COLUMNS}
+    FROM topic_stocks ts
+    JOIN topics t ON ts.topic_id = t.id
+    LEFT JOIN stock_prices sp ON sp.ticker = ts.ticker
+    WHERE ts.ticker = $1
+    LIMIT 1
+"""
+
+SECTOR_STOCKS_SQL = f"""
+    SELECT ts.ticker, ts.company_name, ts.relevance_note,
+           t.sector, t.name_he as topic, t.slug as topic_slug,
+           {PRICE_COLUMNS}
+    FROM topic_stocks ts
+    JOIN topics t ON ts.topic_id = t.id
+    LEFT JOIN stock_prices sp ON sp.ticker = ts.ticker
+    WHERE (t.sector = $1 OR t.sector_en = $1) AND t.is_active = true
+    ORDER BY ts.priority
+"""
+
+RELATED_SQL = f"""
+    SELECT DISTINCT ON (ts2.ticker) ts2.ticker, ts2.company_name, t.name_he as topic,
+           t.slug as topic_slug, ts2.relevance_note,
+           {PRICE_COLUMNS}
+    FROM topic_stocks ts1
+    JOIN topics t ON ts1.topic_id = t.id
+    JOIN topic_stocks ts2 ON ts2.topic_id = t.id
+    LEFT JOIN stock_prices sp ON sp.ticker = ts2.ticker
+    WHERE ts1.ticker = $1
+      AND ts2.ticker != $1
+      AND t.is_active = true
+    ORDER BY ts2.ticker, ts2.priority
+"""
+
+STOCK_SECTOR_SQL = """
+    SELECT t.sector_en FROM topic_stocks ts
+    JOIN topics t ON ts.topic_id = t.id
+    WHERE ts.ticker = $1 LIMIT 1
+"""
+
+PEERS_SQL = f"""
+    SELECT DISTINCT ON (ts.ticker) ts.ticker, ts.company_name,
+           {PRICE_COLUMNS}
+    FROM topic_stocks ts
+    JOIN topics t ON ts.topic_id = t.id
+    LEFT JOIN stock_prices sp ON sp.ticker = ts.ticker
+    WHERE t.sector_en = $1 AND ts.ticker != $2
+    ORDER BY ts.ticker, ts.priority
+    LIMIT 10
+"""
+
 
 @router.get("", response_model=list[StockDetail])
 async def screener(
+    pool: DbPool,
+    stock_service: StockService,
     sector: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
@@ -23,99 +174,63 @@ async def screener(
     search: Optional[str] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
 ):
     """Stock screener — filter and sort stocks."""
-    async with pool.acquire() as conn:
-        stocks = await conn.fetch("""
-            SELECT ts.ticker, ts.company_name, ts.relevance_note,
-                   t.sector, t.sector_en, t.name_he as topic, t.slug as topic_slug
-            FROM topic_stocks ts
-            JOIN topics t ON ts.topic_id = t.id
-            WHERE t.is_active = true
-            ORDER BY ts.priority
-        """)
-
-    seen = set()
-    unique_stocks = []
-    for s in stocks:
-        if s["ticker"] not in seen:
-            seen.add(s["ticker"])
-            unique_stocks.append(s)
-
-    if sector:
-        unique_stocks = [s for s in unique_stocks if s["sector"] == sector or s["sector_en"] == sector]
-
-    if topic:
-        unique_stocks = [s for s in unique_stocks if s["topic_slug"] == topic]
-
     if search:
-        q = search.lower()
-        unique_stocks = [s for s in unique_stocks
-                         if q in s["ticker"].lower() or q in s["company_name"].lower()]
+        # Substring match; escape LIKE wildcards in user input
+        search = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    # The price filters and the change/price orders run in SQL on stock_prices, so
+    # refresh stale prices first; otherwise a page could be filtered and ordered on
+    # old values and then shown with new ones
+    prices_matter = sort_by != "name" or min_price or max_price
+    if prices_matter:
+        async with pool.acquire() as conn:
+            stale = await conn.fetch(STALE_SCREENER_SQL, sector, topic, search, float(stock_service.CACHE_TTL))
+        if stale:
+            await _refresh_prices(pool, [r["ticker"] for r in stale], stock_service)
+
+    async with pool.acquire() as conn:
+        stocks = await conn.fetch(SCREENER_SQL[sort_by], sector, topic, search, min_price or None, max_price or None, limit, offset)
 
-    tickers = [s["ticker"] for s in unique_stocks]
-    prices = stock_service.get_prices_batch(tickers)
+    # After the refresh, show exactly the prices the page was filtered and sorted on
+    prices = await _resolve_prices(pool, stocks, stock_service, refresh=not prices_matter)
 
+    # Rows come straight from Postgres, so skip per-field validation when building models
     results = []
-    for s in unique_stocks:
+    for s in stocks:
         price_data = prices.get(s["ticker"])
-        price = price_data.price if price_data else None
-        change_pct = price_data.change_pct if price_data else None
-        prev_close = price_data.previous_close if price_data else None
-
-        if min_price and price and price < min_price:
-            continue
-        if max_price and price and price > max_price:
-            continue
-
-        results.append(StockDetail(
+        results.append(StockDetail.model_construct(
             ticker=s["ticker"],
             company_name=s["company_name"],
             sector=s["sector"],
             topic=s["topic"],
             topic_slug=s["topic_slug"],
             relevance_note=s["relevance_note"] or "",
-            current_price=price,
-            daily_change_pct=change_pct,
-            previous_close=prev_close,
+            current_price=price_data.price if price_data else None,
+            daily_change_pct=price_data.change_pct if price_data else None,
+            previous_close=price_data.previous_close if price_data else None,
         ))
-
-    if sort_by == "change":
-        results.sort(key=lambda x: x.daily_change_pct or 0, reverse=True)
-    elif sort_by == "price":
-        results.sort(key=lambda x: x.current_price or 999999)
-    elif sort_by == "name":
-        results.sort(key=lambda x: x.ticker)
-
-    return results[offset:offset + limit]
+    return results
 
 
 @router.get("/{ticker}", response_model=StockDetail)
 async def get_stock(
     ticker: str,
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
+    pool: DbPool,
+    stock_service: StockService,
 ):
     """Get a single stock's details and current price."""
     ticker = ticker.upper()
     async with pool.acquire() as conn:
-        stock = await conn.fetchrow("""
-            SELECT ts.ticker, ts.company_name, ts.relevance_note,
-                   t.sector, t.name_he as topic, t.slug as topic_slug
-            FROM topic_stocks ts
-            JOIN topics t ON ts.topic_id = t.id
-            WHERE ts.ticker = $1
-            LIMIT 1
-        """, ticker)
+        stock = await conn.fetchrow(STOCK_SQL, ticker)
 
     if not stock:
         raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
 
-    price_data = stock_service.get_price(ticker)
+    price_data = (await _resolve_prices(pool, [stock], stock_service)).get(ticker)
 
-    return StockDetail(
+    return StockDetail.model_construct(
         ticker=stock["ticker"],
         company_name=stock["company_name"],
         sector=stock["sector"],
@@ -131,33 +246,25 @@ async def get_stock(
 @router.get("/sector/{sector_name}", response_model=list[StockDetail])
 async def get_stocks_by_sector(
     sector_name: str,
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
+    pool: DbPool,
+    stock_service: StockService,
 ):
     """Get all stocks in a sector."""
     async with pool.acquire() as conn:
-        stocks = await conn.fetch("""
-            SELECT ts.ticker, ts.company_name, ts.relevance_note,
-                   t.sector, t.name_he as topic, t.slug as topic_slug
-            FROM topic_stocks ts
-            JOIN topics t ON ts.topic_id = t.id
-            WHERE (t.sector = $1 OR t.sector_en = $1) AND t.is_active = true
-            ORDER BY ts.priority
-        """, sector_name)
-
-    tickers = list(set(s["ticker"] for s in stocks))
-    prices = stock_service.get_prices_batch(tickers)
+        stocks = await conn.fetch(SECTOR_STOCKS_SQL, sector_name)
+
+    prices = await _resolve_prices(pool, stocks, stock_service)
 
     return [
-        StockDetail(
+        StockDetail.model_construct(
             ticker=s["ticker"],
             company_name=s["company_name"],
             sector=s["sector"],
             topic=s["topic"],
             topic_slug=s["topic_slug"],
             relevance_note=s["relevance_note"] or "",
-            current_price=prices.get(s["ticker"], None) and prices[s["ticker"]].price,
-            daily_change_pct=prices.get(s["ticker"], None) and prices[s["ticker"]].change_pct,
+            current_price=price_data.price if (price_data := prices.get(s["ticker"])) else None,
+            daily_change_pct=price_data.change_pct if price_data else None,
         )
         for s in stocks
     ]
@@ -169,25 +276,29 @@ async def get_stock_history(
     period: str = Query("1mo", pattern="^(1mo|3mo|6mo|1y)$"),
 ):
     """Get stock price history for charts."""
-    try:
-        import yfinance as yf
-    except ImportError:
+    if yf is None:
         raise HTTPException(status_code=503, detail="yfinance not available")
 
     ticker = ticker.upper()
-    try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=period)
+
+    def _load_history() -> list[dict] | None:
+        import pandas as pd  # installed with yfinance
+
+        # Download and conversion both block, so the whole thing runs in a worker thread
+        hist = yf.Ticker(ticker).history(period=period)
         if hist.empty:
-            raise HTTPException(status_code=404, detail=f"No history for {ticker}")
+            return None
+        # Column-wise conversion instead of iterrows(); to_dict boxes values to native types
+        return pd.DataFrame({
+            "date": hist.index.strftime("%Y-%m-%d"),
+            "close": hist["Close"].round(2).astype(float).to_numpy(),
+            "volume": hist["Volume"].fillna(0).astype("int64").to_numpy(),
+        }).to_dict(orient="records")
 
-        data = []
-        for date_idx, row in hist.iterrows():
-            data.append({
-                "date": date_idx.strftime("%Y-%m-%d"),
-                "close": round(float(row["Close"]), 2),
-                "volume": int(row["Volume"]) if row["Volume"] else 0,
-            })
+    try:
+        data = await asyncio.to_thread(_load_history)
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"No history for {ticker}")
         return {"ticker": ticker, "period": period, "data": data}
 
     except HTTPException:
@@ -202,36 +313,40 @@ async def get_stock_profile(
     language: Optional[str] = Query(None),
 ):
     """Get enriched company profile: overview, management, financials, analyst data."""
-    try:
-        import yfinance as yf
-    except ImportError:
+    if yf is None:
         raise HTTPException(status_code=503, detail="yfinance not available")
 
     ticker = ticker.upper()
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = await get_info(ticker)
 
-        # Extract top 5 officers with AI-generated bios
+        # Extract top 5 officers with AI-generated bios; bios and translation run concurrently
         company_name = info.get("longName") or info.get("shortName", ticker)
-        officers = []
-        for officer in (info.get("companyOfficers") or [])[:5]:
-            oname = officer.get("name", "")
-            otitle = officer.get("title", "")
-            bio = await _explainer.generate_officer_bio(
-                oname, otitle, company_name, language or "en"
-            )
-            officers.append(CompanyOfficer(
-                name=oname,
-                title=otitle,
-                age=officer.get("age"),
-                total_pay=officer.get("totalPay"),
-                bio=bio,
-            ))
-
+        top_officers = (info.get("companyOfficers") or [])[:5]
         summary = info.get("longBusinessSummary", "")
-        if language == "he" and summary:
-            summary = await _explainer.translate_text(summary, "he", ticker)
+
+        async def _summary():
+            if language == "he" and summary:
+                return await explainer.translate_text(summary, "he", ticker)
+            return summary
+
+        bios, summary = await asyncio.gather(
+            explainer.generate_officer_bios(
+                [(o.get("name", ""), o.get("title", "")) for o in top_officers],
+                company_name, language or "en",
+            ),
+            _summary(),
+        )
+        officers = [
+            CompanyOfficer(
+                name=o.get("name", ""),
+                title=o.get("title", ""),
+                age=o.get("age"),
+                total_pay=o.get("totalPay"),
+                bio=bio,
+            )
+            for o, bio in zip(top_officers, bios)
+        ]
 
         return StockProfileResponse(
             ticker=ticker,
@@ -271,39 +386,21 @@ async def get_stock_profile(
 @router.get("/{ticker}/related")
 async def get_related_stocks(
     ticker: str,
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
+    pool: DbPool,
+    stock_service: StockService,
 ):
     """Get stocks related to this ticker via shared topics."""
     ticker = ticker.upper()
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT DISTINCT ts2.ticker, ts2.company_name, t.name_he as topic,
-                   t.slug as topic_slug, ts2.relevance_note
-            FROM topic_stocks ts1
-            JOIN topics t ON ts1.topic_id = t.id
-            JOIN topic_stocks ts2 ON ts2.topic_id = t.id
-            WHERE ts1.ticker = $1
-              AND ts2.ticker != $1
-              AND t.is_active = true
-            ORDER BY ts2.ticker
-        """, ticker)
+        rows = await conn.fetch(RELATED_SQL, ticker)
 
     if not rows:
         return []
 
-    seen = set()
-    unique = []
-    for r in rows:
-        if r["ticker"] not in seen:
-            seen.add(r["ticker"])
-            unique.append(r)
-
-    tickers = [r["ticker"] for r in unique]
-    prices = stock_service.get_prices_batch(tickers)
+    prices = await _resolve_prices(pool, rows, stock_service)
 
     results = []
-    for r in unique:
+    for r in rows:
         pd = prices.get(r["ticker"])
         results.append({
             "ticker": r["ticker"],
@@ -314,59 +411,47 @@ async def get_related_stocks(
             "daily_change_pct": pd.change_pct if pd else None,
         })
 
-    return results
+    # Plain str/float dicts: hand them to orjson directly instead of through jsonable_encoder
+    return ORJSONResponse(results)
 
 
 @router.get("/{ticker}/peers", response_model=list[PeerStock])
 async def get_peer_stocks(
     ticker: str,
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
+    pool: DbPool,
+    stock_service: StockService,
 ):
     """Get peer stocks from the same sector with comparison metrics."""
-    try:
-        import yfinance as yf
-    except ImportError:
+    if yf is None:
         raise HTTPException(status_code=503, detail="yfinance not available")
 
     ticker = ticker.upper()
 
     # Find the sector of the target stock
     async with pool.acquire() as conn:
-        target = await conn.fetchrow("""
-            SELECT t.sector_en FROM topic_stocks ts
-            JOIN topics t ON ts.topic_id = t.id
-            WHERE ts.ticker = $1 LIMIT 1
-        """, ticker)
+        target = await conn.fetchrow(STOCK_SECTOR_SQL, ticker)
 
         if not target:
             raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
 
         # Find other stocks in same sector
-        peers = await conn.fetch("""
-            SELECT DISTINCT ts.ticker, ts.company_name
-            FROM topic_stocks ts
-            JOIN topics t ON ts.topic_id = t.id
-            WHERE t.sector_en = $1 AND ts.ticker != $2
-            ORDER BY ts.ticker
-            LIMIT 10
-        """, target["sector_en"], ticker)
+        peers = await conn.fetch(PEERS_SQL, target["sector_en"], ticker)
 
     if not peers:
         return []
 
-    peer_tickers = [p["ticker"] for p in peers]
-    prices = stock_service.get_prices_batch(peer_tickers)
+    prices = await _resolve_prices(pool, peers, stock_service)
+
+    # Fetch every peer's info concurrently; a failed lookup just leaves its metrics empty
+    infos = await asyncio.gather(*(get_info(p["ticker"]) for p in peers), return_exceptions=True)
 
     results = []
-    for p in peers:
+    for p, info in zip(peers, infos):
         pd = prices.get(p["ticker"])
-        try:
-            info = yf.Ticker(p["ticker"]).info
-        except Exception:
+        if isinstance(info, Exception):
             info = {}
 
-        results.append(PeerStock(
+        results.append(PeerStock.model_construct(
             ticker=p["ticker"],
             company_name=p["company_name"],
             current_price=pd.price if pd else None,
@@ -388,13 +473,11 @@ async def get_peer_stocks(
 async def deep_research(ticker: str, language: str = Query("en")):
     """Deep research via Perplexity API — real-time web-searched analysis."""
     import os
-    import httpx
 
     api_key = os.getenv("PERPLEXITY_API_KEY")
     if not api_key:
         try:
-            import yfinance as yf
-            info = yf.Ticker(ticker.upper()).info
+            info = await get_info(ticker.upper())
             name = info.get("longName", ticker)
             sector = info.get("sector", "")
             industry = info.get("industry", "")
@@ -429,28 +512,28 @@ async def deep_research(ticker: str, language: str = Query("en")):
         prompt += " Respond in Hebrew."
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "sonar",
-                    "messages": [{"role": "user", "content": prompt}],
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            content = data["choices"][0]["message"]["content"]
-            citations = [{"url": c} for c in data.get("citations", [])]
-
-            return ResearchResponse(
-                ticker=ticker.upper(),
-                analysis=content,
-                citations=citations,
-                generated_at=datetime.now(timezone.utc),
-            )
+        resp = await get_http_client().post(
+            "https://api.perplexity.ai/chat/completions",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": "sonar",
+                "messages": [{"role": "user", "content": prompt}],
+            },
+            timeout=30,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        content = data["choices"][0]["message"]["content"]
+        citations = [{"url": c} for c in data.get("citations", [])]
+
+        return ResearchResponse(
+            ticker=ticker.upper(),
+            analysis=content,
+            citations=citations,
+            generated_at=datetime.now(timezone.utc),
+        )
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Research API error: {str(e)}")
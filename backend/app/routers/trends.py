@@ -1,203 +1,252 @@
 """
 Trends API endpoints for TrendVest.
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+import asyncio
+import orjson
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import ORJSONResponse, Response
 from typing import Optional
-from ..models.schemas import TrendTopic, TopicStock
-from ..deps import get_db_pool, get_stock_service
-from ..services.topic_insights import get_topic_insight, get_all_insights, generate_ai_insight
+from ..models.schemas import TrendTopic
+from ..deps import DbPool, StockService
+from ..services.cache import shared_cache, SingleFlight
+from ..services.topic_insights import (
+    get_topic_insight, get_stock_connection, get_all_insights, generate_ai_insight,
+)
 
 router = APIRouter(prefix="/api/trends", tags=["trends"])
 
+# Momentum only moves when the pipeline runs, which also clears these keys
+TRENDS_TTL = 45
+# Generated insights are reused until momentum moves into another 10-point band
+INSIGHT_TTL = 6 * 3600
+# How long to hold a request for a fresh AI insight when a curated one can stand in
+INSIGHT_WAIT = 2.5
+
+# Browser/CDN caching: lists follow the momentum job, generated insights change far slower.
+# The middleware's ETag lets revalidation end in a 304 without re-rendering
+TRENDS_CACHE_CONTROL = "public, max-age=30, stale-while-revalidate=60"
+INSIGHT_CACHE_CONTROL = "public, max-age=1800, stale-while-revalidate=3600"
+
+# Concurrent misses for the same insight share one generation. It also keeps the
+# task referenced, so a generation can outlive the request that started it
+_insight_flight = SingleFlight()
+
+
+# ── Queries (asyncpg prepares each once per pooled connection) ──
+
+# Rank the topics, then attach their stocks in the same round trip.
+# mv_topic_rank already holds active topics joined with momentum, indexed by score
+_TRENDS_TEMPLATE = """
+    WITH ranked AS (
+        SELECT id, slug, name_en, name_he, sector, sector_en,
+               score as momentum_score, direction, mention_count_today, mention_avg_7d
+        FROM mv_topic_rank{sector_filter}
+        ORDER BY score DESC
+        LIMIT $1
+    )
+    SELECT r.*, ts.ticker, ts.company_name, ts.relevance_note
+    FROM ranked r
+    LEFT JOIN topic_stocks ts ON ts.topic_id = r.id
+    ORDER BY r.momentum_score DESC, r.id, ts.priority
+"""
+# Two fixed statements rather than appending the filter, so both plans stay cached
+TRENDS_SQL = _TRENDS_TEMPLATE.format(sector_filter="")
+TRENDS_BY_SECTOR_SQL = _TRENDS_TEMPLATE.format(sector_filter=" WHERE sector = $2 OR sector_en = $2")
+
+# Topic columns repeat on each stock row; a topic without stocks yields one NULL row
+TREND_SQL = """
+    SELECT t.slug, t.name_en, t.name_he, t.sector, t.sector_en,
+           COALESCE(m.score, 0) as momentum_score,
+           COALESCE(m.direction, 'stable') as direction,
+           COALESCE(m.mention_count_today, 0) as mention_count_today,
+           COALESCE(m.mention_avg_7d, 0) as mention_avg_7d,
+           ts.ticker, ts.company_name, ts.relevance_note
+    FROM topics t
+    LEFT JOIN momentum_scores m ON t.id = m.topic_id
+    LEFT JOIN topic_stocks ts ON ts.topic_id = t.id
+    WHERE t.slug = $1 AND t.is_active = true
+    ORDER BY ts.priority
+"""
+
+# Topic name, momentum and top five stocks (as a JSON array) in one row
+INSIGHT_SQL = """
+    SELECT t.name_en, COALESCE(m.score, 0) AS momentum_score,
+           COALESCE((
+               SELECT json_agg(x)
+               FROM (
+                   SELECT ts.ticker, ts.company_name
+                   FROM topic_stocks ts
+                   WHERE ts.topic_id = t.id
+                   ORDER BY ts.priority
+                   LIMIT 5
+               ) x
+           ), '[]') AS stocks
+    FROM topics t
+    LEFT JOIN momentum_scores m ON m.topic_id = t.id
+    WHERE t.slug = $1 AND t.is_active = true
+"""
+
+
+# Payloads are serialized straight to orjson, so they're built as plain dicts
+# shaped like TopicStock / TrendTopic rather than as models
+def _topic_stock(row, prices: dict) -> dict:
+    """TopicStock fields from a topic_stocks row and the batch price lookup."""
+    price_data = prices.get(row["ticker"])
+    return {
+        "ticker": row["ticker"],
+        "company_name": row["company_name"],
+        "relevance_note": row["relevance_note"] or "",
+        "current_price": price_data.price if price_data else None,
+        "daily_change_pct": price_data.change_pct if price_data else None,
+        "previous_close": price_data.previous_close if price_data else None,
+    }
+
+
+def _json_response(body: bytes, cache_control: str = TRENDS_CACHE_CONTROL) -> Response:
+    return Response(content=body, media_type="application/json",
+                    headers={"Cache-Control": cache_control})
+
+
+def _trend_topic(topic, stock_rows: list, prices: dict) -> dict:
+    """TrendTopic fields from its topic columns and its (priority-ordered) stock rows."""
+    return {
+        "slug": topic["slug"],
+        "name_en": topic["name_en"],
+        "name_he": topic["name_he"],
+        "sector": topic["sector"],
+        "sector_en": topic["sector_en"],
+        "momentum_score": topic["momentum_score"],
+        "direction": topic["direction"],
+        "mention_count_today": topic["mention_count_today"],
+        "mention_avg_7d": topic["mention_avg_7d"],
+        "stocks": [_topic_stock(s, prices) for s in stock_rows],
+    }
+
 
 @router.get("", response_model=list[TrendTopic])
 async def get_trends(
+    pool: DbPool,
+    stock_service: StockService,
     sector: Optional[str] = Query(None, description="Filter by sector"),
     limit: int = Query(20, le=50),
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
 ):
     """Get all topics sorted by momentum score."""
-    async with pool.acquire() as conn:
-        query = """
-            SELECT t.slug, t.name_en, t.name_he, t.sector, t.sector_en,
-                   COALESCE(m.score, 0) as momentum_score,
-                   COALESCE(m.direction, 'stable') as direction,
-                   COALESCE(m.mention_count_today, 0) as mention_count_today,
-                   COALESCE(m.mention_avg_7d, 0) as mention_avg_7d
-            FROM topics t
-            LEFT JOIN momentum_scores m ON t.id = m.topic_id
-            WHERE t.is_active = true
-        """
-        params = []
+    cache_key = f"trends:list:{sector or ''}:{limit}"
+    cached = await shared_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached)
 
+    async with pool.acquire() as conn:
         if sector:
-            query += " AND (t.sector = $1 OR t.sector_en = $1)"
-            params.append(sector)
-
-        query += " ORDER BY COALESCE(m.score, 0) DESC LIMIT $" + str(len(params) + 1)
-        params.append(limit)
-
-        topics = await conn.fetch(query, *params)
-
-        results = []
-        all_stocks_raw = []
-        for topic in topics:
-            stocks = await conn.fetch("""
-                SELECT ticker, company_name, relevance_note
-                FROM topic_stocks ts
-                JOIN topics t ON ts.topic_id = t.id
-                WHERE t.slug = $1
-                ORDER BY ts.priority
-            """, topic["slug"])
-
-            stock_list = [
-                TopicStock(
-                    ticker=s["ticker"],
-                    company_name=s["company_name"],
-                    relevance_note=s["relevance_note"] or "",
-                )
-                for s in stocks
-            ]
-            all_stocks_raw.extend(stock_list)
-
-            results.append(TrendTopic(
-                slug=topic["slug"],
-                name_en=topic["name_en"],
-                name_he=topic["name_he"],
-                sector=topic["sector"],
-                sector_en=topic["sector_en"],
-                momentum_score=topic["momentum_score"],
-                direction=topic["direction"],
-                mention_count_today=topic["mention_count_today"],
-                mention_avg_7d=topic["mention_avg_7d"],
-                stocks=stock_list,
-            ))
-
-        # Fetch prices for all tickers in one batch
-        all_tickers = list(set(s.ticker for s in all_stocks_raw))
-        if all_tickers:
-            prices = stock_service.get_prices_batch(all_tickers)
-            for topic_result in results:
-                for stock in topic_result.stocks:
-                    price_data = prices.get(stock.ticker)
-                    if price_data:
-                        stock.current_price = price_data.price
-                        stock.daily_change_pct = price_data.change_pct
-                        stock.previous_close = price_data.previous_close
-
-        return results
+            rows = await conn.fetch(TRENDS_BY_SECTOR_SQL, limit, sector)
+        else:
+            rows = await conn.fetch(TRENDS_SQL, limit)
+
+    # Group stock rows under their topic; dicts keep the momentum order
+    topics = {}
+    for row in rows:
+        stock_rows = topics.setdefault(row["slug"], (row, []))[1]
+        if row["ticker"] is not None:
+            stock_rows.append(row)
+
+    # Fetch prices for all tickers in one batch (deduped in momentum order); misses hit yfinance, so off the event loop
+    all_tickers = list(dict.fromkeys(r["ticker"] for r in rows if r["ticker"] is not None))
+    prices = await asyncio.to_thread(stock_service.get_prices_batch, all_tickers) if all_tickers else {}
+
+    results = [_trend_topic(topic, stock_rows, prices) for topic, stock_rows in topics.values()]
+    body = orjson.dumps(results)
+    await shared_cache.set(cache_key, body, TRENDS_TTL)
+    return _json_response(body)
 
 
 @router.get("/{slug}", response_model=TrendTopic)
 async def get_trend_by_slug(
     slug: str,
-    pool=Depends(get_db_pool),
-    stock_service=Depends(get_stock_service),
+    pool: DbPool,
+    stock_service: StockService,
 ):
     """Get a single topic by slug with full details."""
+    cache_key = f"trends:slug:{slug}"
+    cached = await shared_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached)
+
     async with pool.acquire() as conn:
-        topic = await conn.fetchrow("""
-            SELECT t.slug, t.name_en, t.name_he, t.sector, t.sector_en,
-                   COALESCE(m.score, 0) as momentum_score,
-                   COALESCE(m.direction, 'stable') as direction,
-                   COALESCE(m.mention_count_today, 0) as mention_count_today,
-                   COALESCE(m.mention_avg_7d, 0) as mention_avg_7d
-            FROM topics t
-            LEFT JOIN momentum_scores m ON t.id = m.topic_id
-            WHERE t.slug = $1 AND t.is_active = true
-        """, slug)
-
-        if not topic:
-            raise HTTPException(status_code=404, detail="Topic not found")
-
-        stocks = await conn.fetch("""
-            SELECT ticker, company_name, relevance_note
-            FROM topic_stocks ts
-            JOIN topics t ON ts.topic_id = t.id
-            WHERE t.slug = $1
-            ORDER BY ts.priority
-        """, slug)
-
-        stock_list = [TopicStock(
-            ticker=s["ticker"],
-            company_name=s["company_name"],
-            relevance_note=s["relevance_note"] or "",
-        ) for s in stocks]
-
-        # Fetch prices
-        tickers = [s.ticker for s in stock_list]
-        if tickers:
-            prices = stock_service.get_prices_batch(tickers)
-            for stock in stock_list:
-                price_data = prices.get(stock.ticker)
-                if price_data:
-                    stock.current_price = price_data.price
-                    stock.daily_change_pct = price_data.change_pct
-                    stock.previous_close = price_data.previous_close
-
-        return TrendTopic(
-            slug=topic["slug"],
-            name_en=topic["name_en"],
-            name_he=topic["name_he"],
-            sector=topic["sector"],
-            sector_en=topic["sector_en"],
-            momentum_score=topic["momentum_score"],
-            direction=topic["direction"],
-            mention_count_today=topic["mention_count_today"],
-            mention_avg_7d=topic["mention_avg_7d"],
-            stocks=stock_list,
-        )
+        rows = await conn.fetch(TREND_SQL, slug)
+
+    if not rows:
+        raise HTTPException(status_code=404, detail="Topic not found")
+
+    stocks = [r for r in rows if r["ticker"] is not None]
+
+    # Fetch prices
+    tickers = [s["ticker"] for s in stocks]
+    prices = await asyncio.to_thread(stock_service.get_prices_batch, tickers) if tickers else {}
+
+    body = orjson.dumps(_trend_topic(rows[0], stocks, prices))
+    await shared_cache.set(cache_key, body, TRENDS_TTL)
+    return _json_response(body)
 
 
 @router.get("/{slug}/insight")
 async def get_trend_insight(
     slug: str,
+    pool: DbPool,
     language: str = Query("en", description="Language: en or he"),
-    pool=Depends(get_db_pool),
 ):
     """Get AI-powered insight for a topic: why it's trending and stock connections."""
     # First try to generate a fresh AI insight if API key is available
     async with pool.acquire() as conn:
-        topic = await conn.fetchrow(
-            "SELECT name_en FROM topics WHERE slug = $1 AND is_active = true", slug
-        )
-        if not topic:
-            raise HTTPException(status_code=404, detail="Topic not found")
-
-        stocks = await conn.fetch("""
-            SELECT ticker, company_name FROM topic_stocks ts
-            JOIN topics t ON ts.topic_id = t.id
-            WHERE t.slug = $1 ORDER BY ts.priority LIMIT 5
-        """, slug)
-
-        momentum = await conn.fetchrow(
-            "SELECT score FROM momentum_scores ms JOIN topics t ON ms.topic_id = t.id WHERE t.slug = $1",
-            slug,
-        )
+        topic = await conn.fetchrow(INSIGHT_SQL, slug)
+    if not topic:
+        raise HTTPException(status_code=404, detail="Topic not found")
+
+    momentum_score = topic["momentum_score"]
+    cache_key = f"insight:{slug}:{language}:{int(momentum_score // 10)}"
+    cached = await shared_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached, INSIGHT_CACHE_CONTROL)
 
-    # Try AI generation first
-    ai_result = await generate_ai_insight(
+    # Start AI generation and give it a short head start over the curated fallback;
+    # if it loses, it keeps running and caches its result for the next viewer
+    curated = get_topic_insight(slug, language)
+    ai_insight = _insight_flight.do(cache_key, lambda: _generate_insight(
+        cache_key,
         slug=slug,
         topic_name=topic["name_en"],
-        stocks=[dict(s) for s in stocks],
+        stocks=orjson.loads(topic["stocks"]),
         language=language,
-        momentum_score=momentum["score"] if momentum else 0,
-    )
-    if ai_result:
-        return ai_result
+        momentum_score=momentum_score,
+    ))
+    try:
+        body = await asyncio.wait_for(ai_insight, timeout=INSIGHT_WAIT if curated else None)
+    except asyncio.TimeoutError:
+        body = None
+    if body is not None:
+        return _json_response(body, INSIGHT_CACHE_CONTROL)
 
-    # Fall back to curated insights
-    curated = get_topic_insight(slug, language)
+    # Fall back to curated insights (plain dicts, so straight to orjson). Only cached
+    # briefly, since the AI insight may still land in the background
+    short_cache = {"Cache-Control": TRENDS_CACHE_CONTROL}
     if curated:
-        return curated
+        return ORJSONResponse(curated, headers=short_cache)
 
     # No insight available
-    return {
+    return ORJSONResponse({
         "slug": slug,
         "why_trending": "No insight available for this topic yet." if language == "en" else "אין מידע זמין על נושא זה עדיין.",
         "stock_connections": {},
-    }
+    }, headers=short_cache)
+
+
+async def _generate_insight(cache_key: str, **kwargs) -> bytes | None:
+    """Generate an AI insight and cache its serialized form. None if generation failed."""
+    ai_result = await generate_ai_insight(**kwargs)
+    if not ai_result:
+        return None
+    body = orjson.dumps(ai_result)
+    await shared_cache.set(cache_key, body, INSIGHT_TTL)
+    return body
 
 
 @router.get("/{slug}/stock-insight/{ticker}")
@@ -207,21 +256,16 @@ async def get_stock_insight(
     language: str = Query("en", description="Language: en or he"),
 ):
     """Get insight about how a specific stock connects to a trending topic."""
-    curated = get_topic_insight(slug, language)
-    if curated and ticker.upper() in curated.get("stock_connections", {}):
-        return {
-            "slug": slug,
-            "ticker": ticker.upper(),
-            "connection": curated["stock_connections"][ticker.upper()],
-        }
-
-    fallback = (
-        f"No specific insight available for {ticker.upper()} in this trend."
-        if language == "en"
-        else f"אין מידע ספציפי על {ticker.upper()} בטרנד הזה."
-    )
-    return {
+    ticker = ticker.upper()
+    connection = get_stock_connection(slug, language, ticker)
+    if connection is None:
+        connection = (
+            f"No specific insight available for {ticker} in this trend."
+            if language == "en"
+            else f"אין מידע ספציפי על {ticker} בטרנד הזה."
+        )
+    return ORJSONResponse({
         "slug": slug,
-        "ticker": ticker.upper(),
-        "connection": fallback,
-    }
+        "ticker": ticker,
+        "connection": connection,
+    }, headers={"Cache-Control": INSIGHT_CACHE_CONTROL})
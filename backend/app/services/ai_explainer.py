@@ -3,15 +3,32 @@ AI Explainer service for TrendVest.
 Uses Claude to answer financial questions in Hebrew or English.
 """
 import os
-from datetime import datetime, timezone, date
-from collections import defaultdict
+import json
+import random
+import asyncio
+import itertools
+from datetime import date
+from functools import lru_cache
 from typing import Optional
 
+import httpx
+from cachetools import TTLCache
+
+from .cache import shared_cache
+from .http_client import get_http_client
+
 try:
     import anthropic
 except ImportError:
     anthropic = None
 
+# Claude calls run longer than the shared client's default timeout
+CLAUDE_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+# In-flight Claude calls per process; more tends to end in connection errors on the shared client
+CLAUDE_CONCURRENCY = 8
+# Shared by every Claude caller in the process (chat, explanations, topic insights)
+claude_slots = asyncio.Semaphore(CLAUDE_CONCURRENCY)
+
 SYSTEM_PROMPT_HE = """אתה העוזר הדיגיטלי של TrendVest — פלטפורמה ישראלית למעקב מגמות בשוק ההון.
 
 התפקיד שלך:
@@ -75,6 +92,14 @@ SUGGESTED_QUESTIONS_EN = [
     "What's the difference between a stock and a bond?",
 ]
 
+
+def _suggestion_rotation(questions: list[str]):
+    """Endless cycle over every 3-question pick, shuffled once so neighbours differ."""
+    picks = list(itertools.combinations(questions, 3))
+    random.shuffle(picks)
+    return itertools.cycle(picks)
+
+
 SUGGESTED_QUESTIONS_TOPIC_HE = [
     "למה {topic} טרנדי עכשיו?",
     "אילו חברות קשורות ל{topic}?",
@@ -89,6 +114,39 @@ SUGGESTED_QUESTIONS_TOPIC_EN = [
     "Is {topic} a long-term trend?",
 ]
 
+
+@lru_cache(maxsize=512)
+def _topic_suggestions(context: str, language: str) -> tuple[str, ...]:
+    """Topic follow-up questions, formatted once per (topic, language)."""
+    templates = SUGGESTED_QUESTIONS_TOPIC_HE if language == "he" else SUGGESTED_QUESTIONS_TOPIC_EN
+    return tuple(q.format(topic=context) for q in templates[:3])
+
+
+@lru_cache(maxsize=256)
+def _context_preamble(context: str, language: str) -> tuple[dict, dict]:
+    """Context/acknowledgement exchange that primes ask() with the topic being viewed."""
+    if language == "he":
+        ctx_msg = f"הקשר: המשתמש צופה כרגע בנושא: {context}"
+        ack_msg = "הבנתי, אענה בהקשר של הנושא הזה."
+    else:
+        ctx_msg = f"Context: The user is currently viewing the topic: {context}"
+        ack_msg = "Got it, I'll answer in the context of this topic."
+    return (
+        {"role": "user", "content": ctx_msg},
+        {"role": "assistant", "content": ack_msg},
+    )
+
+
+# Usage counters are keyed per calendar day; the window just lets old keys expire
+RATE_LIMIT_WINDOW = 86400
+
+# Generated text is reused for a week, then regenerated on next request
+EXPLAIN_TTL = 7 * 86400
+EXPLAIN_CACHE_SIZE = 10_000
+
+# Below this many uncached officers, separate bio calls are as quick as a combined one
+BIO_COMBINE_MIN = 3
+
 # Fallback responses when no API key
 FALLBACK_HE = (
     "שירות ה-AI לא פעיל כרגע (חסר API key).\n\n"
@@ -110,115 +168,90 @@ FALLBACK_EN = (
 
 
 class AIExplainer:
-    MAX_CACHE_SIZE = 500
-
     def __init__(self):
         self.api_key = os.getenv("ANTHROPIC_API_KEY", "")
-        self._client = None
-        self._daily_usage: dict[str, dict] = defaultdict(lambda: {"date": date.today(), "count": 0})
+        self._aclient = None
         self.free_daily_limit = 3
-        self._cache: dict[str, str] = {}
-        self._cache_order: list[str] = []  # tracks insertion order for eviction
-
-    def _cache_set(self, key: str, value: str):
-        """Add to cache with LRU-style eviction when over limit."""
-        if key in self._cache:
-            self._cache[key] = value
-            return
-        if len(self._cache) >= self.MAX_CACHE_SIZE:
-            evict_count = len(self._cache) - self.MAX_CACHE_SIZE + 1
-            for old_key in self._cache_order[:evict_count]:
-                self._cache.pop(old_key, None)
-            self._cache_order = self._cache_order[evict_count:]
+        self._suggestions_he = _suggestion_rotation(SUGGESTED_QUESTIONS_HE)
+        self._suggestions_en = _suggestion_rotation(SUGGESTED_QUESTIONS_EN)
+        # Generated translations, definitions, section summaries and bios
+        self._cache: TTLCache[str, str] = TTLCache(maxsize=EXPLAIN_CACHE_SIZE, ttl=EXPLAIN_TTL)
+
+    async def _cache_get(self, key: str) -> str | None:
+        """Process cache first, then Redis (when configured) so workers share results."""
+        value = self._cache.get(key)
+        if value is None and shared_cache.remote:
+            raw = await shared_cache.get(f"explain:{key}")
+            if raw is not None:
+                value = self._cache[key] = raw.decode()
+        return value
+
+    async def _cache_set(self, key: str, value: str):
         self._cache[key] = value
-        self._cache_order.append(key)
+        if shared_cache.remote:
+            await shared_cache.set(f"explain:{key}", value.encode(), EXPLAIN_TTL)
 
     @property
-    def client(self):
-        if self._client is None:
+    def aclient(self):
+        """Async client for request handlers; rides on the shared pooled httpx client."""
+        if self._aclient is None:
             if not anthropic:
                 return None
             if not self.api_key:
                 return None
-            self._client = anthropic.Anthropic(api_key=self.api_key)
-        return self._client
-
-    def check_rate_limit(self, user_id: str) -> tuple[bool, int]:
-        today = date.today()
-        # Clean stale entries from previous days
-        stale_users = [
-            uid for uid, u in self._daily_usage.items()
-            if u["date"] != today
-        ]
-        for uid in stale_users:
-            if uid != user_id:
-                del self._daily_usage[uid]
-
-        usage = self._daily_usage[user_id]
-        if usage["date"] != today:
-            usage["date"] = today
-            usage["count"] = 0
-        remaining = max(0, self.free_daily_limit - usage["count"])
-        return remaining > 0, remaining
-
-    def record_usage(self, user_id: str):
-        usage = self._daily_usage[user_id]
-        if usage["date"] != date.today():
-            usage["date"] = date.today()
-            usage["count"] = 0
-        usage["count"] += 1
+            self._aclient = anthropic.AsyncAnthropic(
+                api_key=self.api_key, max_retries=2, timeout=CLAUDE_TIMEOUT,
+                http_client=get_http_client(),
+            )
+        return self._aclient
 
-    async def ask(self, question: str, context: str | None = None,
-                  user_id: str = "anonymous", language: str = "he") -> dict:
-        allowed, remaining = self.check_rate_limit(user_id)
-        if not allowed:
-            msg = ("הגעת למגבלת השאלות היומית (3 שאלות ביום בחינם)."
-                   if language == "he"
-                   else "You've reached the daily question limit (3 questions/day free).")
-            return {
-                "answer": msg,
-                "suggested_questions": [],
-                "questions_remaining": 0,
-            }
+    async def _complete(self, **kwargs) -> str:
+        """Run one Claude messages call under the concurrency cap and return its text."""
+        async with claude_slots:
+            response = await self.aclient.messages.create(
+                model="claude-haiku-4-5-20251001", **kwargs,
+            )
+        return response.content[0].text
+
+    @staticmethod
+    def _usage_key(user_id: str) -> str:
+        return f"chat:{user_id}:{date.today()}"
+
+    async def consume_question(self, user_id: str) -> tuple[bool, int]:
+        """Count one question against today's limit. Returns (allowed, remaining)."""
+        # Shared across workers when Redis is configured, so the limit is per user, not per process
+        used = await shared_cache.incr_window(self._usage_key(user_id), RATE_LIMIT_WINDOW)
+        return used <= self.free_daily_limit, max(0, self.free_daily_limit - used)
 
+    async def questions_remaining(self, user_id: str) -> int:
+        used = await shared_cache.count(self._usage_key(user_id))
+        return max(0, self.free_daily_limit - used)
+
+    async def ask(self, question: str, context: str | None = None,
+                  language: str = "he") -> dict:
+        """Answer a question. Rate limiting is the caller's job (see consume_question)."""
         # Select language-specific content
         system_prompt = SYSTEM_PROMPT_HE if language == "he" else SYSTEM_PROMPT_EN
         general_suggestions = SUGGESTED_QUESTIONS_HE if language == "he" else SUGGESTED_QUESTIONS_EN
-        topic_suggestions = SUGGESTED_QUESTIONS_TOPIC_HE if language == "he" else SUGGESTED_QUESTIONS_TOPIC_EN
 
         # Graceful fallback when no API key
-        if self.client is None:
-            self.record_usage(user_id)
-            _, remaining_after = self.check_rate_limit(user_id)
+        if self.aclient is None:
             fallback = FALLBACK_HE if language == "he" else FALLBACK_EN
             return {
                 "answer": fallback,
                 "suggested_questions": general_suggestions[:3],
-                "questions_remaining": remaining_after,
             }
 
         # Build messages
-        messages = []
-        if context:
-            ctx_msg = (f"הקשר: המשתמש צופה כרגע בנושא: {context}"
-                       if language == "he"
-                       else f"Context: The user is currently viewing the topic: {context}")
-            ack_msg = ("הבנתי, אענה בהקשר של הנושא הזה."
-                       if language == "he"
-                       else "Got it, I'll answer in the context of this topic.")
-            messages.append({"role": "user", "content": ctx_msg})
-            messages.append({"role": "assistant", "content": ack_msg})
-
+        messages = list(_context_preamble(context, language)) if context else []
         messages.append({"role": "user", "content": question})
 
         try:
-            response = self.client.messages.create(
-                model="claude-haiku-4-5-20251001",
+            answer = await self._complete(
                 max_tokens=500,
                 system=system_prompt,
                 messages=messages,
             )
-            answer = response.content[0].text
         except Exception as e:
             print(f"Claude API error: {e}")
             answer = (
@@ -227,19 +260,14 @@ class AIExplainer:
                 else "Sorry, I encountered a technical issue. Please try again in a few seconds."
             )
 
-        self.record_usage(user_id)
-        _, remaining_after = self.check_rate_limit(user_id)
-
         if context:
-            suggestions = [q.format(topic=context) for q in topic_suggestions[:3]]
+            suggestions = list(_topic_suggestions(context, language))
         else:
-            import random
-            suggestions = random.sample(general_suggestions, min(3, len(general_suggestions)))
+            suggestions = list(next(self._suggestions_he if language == "he" else self._suggestions_en))
 
         return {
             "answer": answer,
             "suggested_questions": suggestions,
-            "questions_remaining": remaining_after,
         }
 
     async def translate_text(self, text: str, target_language: str, ticker: str) -> str:
@@ -247,19 +275,18 @@ class AIExplainer:
         if target_language != "he":
             return text
         cache_key = f"translate:{ticker}:{target_language}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        if self.client is None:
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        if self.aclient is None:
             return text
         try:
-            response = self.client.messages.create(
-                model="claude-haiku-4-5-20251001",
+            translated = await self._complete(
                 max_tokens=800,
                 system="You are a professional translator. Translate the given company description to Hebrew. Output ONLY the translation, nothing else.",
                 messages=[{"role": "user", "content": text}],
             )
-            translated = response.content[0].text
-            self._cache_set(cache_key, translated)
+            await self._cache_set(cache_key, translated)
             return translated
         except Exception as e:
             print(f"Translation error: {e}")
@@ -268,20 +295,19 @@ class AIExplainer:
     async def explain_term(self, term: str, language: str = "he") -> str:
         """Return a 1-2 sentence definition of a financial term."""
         cache_key = f"term:{term.lower()}:{language}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        if self.client is None:
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        if self.aclient is None:
             return term
         lang_instruction = "Answer in Hebrew." if language == "he" else "Answer in English."
         try:
-            response = self.client.messages.create(
-                model="claude-haiku-4-5-20251001",
+            explanation = await self._complete(
                 max_tokens=200,
                 system=f"You are a financial education assistant. {lang_instruction} Give a concise 1-2 sentence definition. No disclaimers needed.",
                 messages=[{"role": "user", "content": f"Define: {term}"}],
             )
-            explanation = response.content[0].text
-            self._cache_set(cache_key, explanation)
+            await self._cache_set(cache_key, explanation)
             return explanation
         except Exception as e:
             print(f"Explain term error: {e}")
@@ -290,16 +316,16 @@ class AIExplainer:
     async def explain_section(self, ticker: str, section: str, data: dict, language: str = "he") -> str:
         """Return a contextual AI summary of a stock's financial section with actual numbers."""
         cache_key = f"section:{ticker}:{section}:{language}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        if self.client is None:
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        if self.aclient is None:
             fallback = "AI service unavailable." if language == "en" else "שירות ה-AI לא זמין כרגע."
             return fallback
         lang_instruction = "Answer in Hebrew." if language == "he" else "Answer in English."
         data_str = "\n".join(f"- {k}: {v}" for k, v in data.items() if v is not None)
         try:
-            response = self.client.messages.create(
-                model="claude-haiku-4-5-20251001",
+            explanation = await self._complete(
                 max_tokens=400,
                 system=(
                     f"You are a financial education assistant. {lang_instruction} "
@@ -308,8 +334,7 @@ class AIExplainer:
                 ),
                 messages=[{"role": "user", "content": f"Explain {ticker}'s {section} data:\n{data_str}"}],
             )
-            explanation = response.content[0].text
-            self._cache_set(cache_key, explanation)
+            await self._cache_set(cache_key, explanation)
             return explanation
         except Exception as e:
             print(f"Explain section error: {e}")
@@ -319,14 +344,14 @@ class AIExplainer:
     async def generate_officer_bio(self, name: str, title: str, company: str, language: str = "en") -> str:
         """Generate a 1-2 sentence professional bio for a company officer."""
         cache_key = f"bio:{name}:{company}:{language}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        if self.client is None:
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        if self.aclient is None:
             return ""
         lang_instruction = "Answer in Hebrew." if language == "he" else "Answer in English."
         try:
-            response = self.client.messages.create(
-                model="claude-haiku-4-5-20251001",
+            bio = await self._complete(
                 max_tokens=150,
                 system=(
                     f"You are a professional bio writer. {lang_instruction} "
@@ -335,9 +360,52 @@ class AIExplainer:
                 ),
                 messages=[{"role": "user", "content": f"Write a short bio for {name}, {title} at {company}."}],
             )
-            bio = response.content[0].text
-            self._cache_set(cache_key, bio)
+            await self._cache_set(cache_key, bio)
             return bio
         except Exception as e:
             print(f"Officer bio error: {e}")
             return ""
+
+    async def generate_officer_bios(self, officers: list[tuple[str, str]], company: str,
+                                    language: str = "en") -> list[str]:
+        """Bios for (name, title) pairs, in order. Uncached bios for three or more
+        officers are written in a single Claude call instead of one call each."""
+        keys = [f"bio:{name}:{company}:{language}" for name, _ in officers]
+        missing = [i for i, key in enumerate(keys) if await self._cache_get(key) is None]
+        if len(missing) >= BIO_COMBINE_MIN and self.aclient is not None:
+            bios = await self._combined_bios([officers[i] for i in missing], company, language)
+            if bios is not None:
+                for i, bio in zip(missing, bios):
+                    await self._cache_set(keys[i], bio)
+        # Whatever is still missing (few officers, or the combined call failed) goes one by one
+        return list(await asyncio.gather(*(
+            self.generate_officer_bio(name, title, company, language) for name, title in officers
+        )))
+
+    async def _combined_bios(self, officers: list[tuple[str, str]], company: str,
+                             language: str) -> list[str] | None:
+        lang_instruction = "Answer in Hebrew." if language == "he" else "Answer in English."
+        people = "\n".join(f"{i + 1}. {name}, {title}" for i, (name, title) in enumerate(officers))
+        try:
+            text = await self._complete(
+                max_tokens=150 * len(officers),
+                system=(
+                    f"You are a professional bio writer. {lang_instruction} "
+                    "Write a concise 1-2 sentence professional summary for each person. "
+                    "Focus on their role and what they oversee. No speculation. "
+                    "Output ONLY a JSON array of strings, one bio per person, in the given order."
+                ),
+                messages=[{"role": "user", "content": f"Write short bios for these people at {company}:\n{people}"}],
+            )
+            bios = json.loads(text[text.find("["):text.rfind("]") + 1])
+        except Exception as e:
+            print(f"Officer bios error: {e}")
+            return None
+        if not isinstance(bios, list) or len(bios) != len(officers) or not all(isinstance(b, str) for b in bios):
+            print(f"Officer bios error: expected a list of {len(officers)} bios")
+            return None
+        return bios
+
+
+# One instance per process so every router shares its client and response cache
+explainer = AIExplainer()
@@ -0,0 +1,152 @@
+"""
+Shared cache tier for TrendVest.
+Uses Redis when REDIS_URL is set so every worker sees the same entries;
+falls back to an in-process TTL cache when Redis is absent or unreachable.
+"""
+import os
+import time
+import asyncio
+import logging
+
+from cachetools import TLRUCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+def _entry_ttu(_key, entry, now):
+    return now + entry[1]
+
+
+def _counter_ttu(_key, entry, _now):
+    return entry[1]
+
+
+# Atomic fixed-window counter: the first hit in a window starts its expiry
+_INCR_WINDOW_LUA = """
+local c = redis.call('INCR', KEYS[1])
+if c == 1 then redis.call('EXPIRE', KEYS[1], ARGV[1]) end
+return c
+"""
+
+
+class SharedCache:
+    """Async bytes cache backed by Redis, fail-open to process memory."""
+
+    def __init__(self, url: str | None = None, local_maxsize: int = 1024):
+        self._url = url if url is not None else os.getenv("REDIS_URL", "")
+        self._redis = None
+        # Entries are (value, ttl) so each key expires on its own schedule
+        self._local = TLRUCache(maxsize=local_maxsize, ttu=_entry_ttu, timer=time.monotonic)
+        # Counters are (count, expires_at) so increments don't push the window out
+        self._counters = TLRUCache(maxsize=100_000, ttu=_counter_ttu, timer=time.monotonic)
+        self._incr_window = None
+
+    @property
+    def remote(self) -> bool:
+        """True when entries are shared through Redis."""
+        return self._redis is not None
+
+    async def connect(self):
+        if not self._url:
+            return
+        if aioredis is None:
+            logger.warning("REDIS_URL is set but redis is not installed. Run: pip install redis")
+            return
+        client = aioredis.from_url(self._url)
+        try:
+            await client.ping()
+        except Exception as e:
+            logger.warning(f"Redis unavailable, using in-process cache: {e}")
+            await client.aclose()
+            return
+        self._redis = client
+        self._incr_window = client.register_script(_INCR_WINDOW_LUA)
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+            self._incr_window = None
+
+    async def get(self, key: str) -> bytes | None:
+        if self._redis is not None:
+            try:
+                return await self._redis.get(key)
+            except Exception as e:
+                logger.warning(f"Redis GET failed for {key}: {e}")
+        entry = self._local.get(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, value, ex=ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Redis SET failed for {key}: {e}")
+        self._local[key] = (value, ttl)
+
+    async def delete_prefix(self, prefix: str):
+        """Drop every entry whose key starts with `prefix`."""
+        if self._redis is not None:
+            try:
+                keys = [k async for k in self._redis.scan_iter(match=f"{prefix}*", count=500)]
+                if keys:
+                    await self._redis.unlink(*keys)
+            except Exception as e:
+                logger.warning(f"Redis delete failed for {prefix}*: {e}")
+        for key in [k for k in self._local.keys() if k.startswith(prefix)]:
+            self._local.pop(key, None)
+
+    async def incr_window(self, key: str, window: int) -> int:
+        """Increment a counter that resets `window` seconds after its first hit."""
+        if self._redis is not None:
+            try:
+                return int(await self._incr_window(keys=[key], args=[window]))
+            except Exception as e:
+                logger.warning(f"Redis INCR failed for {key}: {e}")
+        count, expires_at = self._counters.get(key, (0, time.monotonic() + window))
+        self._counters[key] = (count + 1, expires_at)
+        return count + 1
+
+    async def count(self, key: str) -> int:
+        """Current value of an incr_window counter, 0 if absent or expired."""
+        if self._redis is not None:
+            try:
+                return int(await self._redis.get(key) or 0)
+            except Exception as e:
+                logger.warning(f"Redis GET failed for {key}: {e}")
+        entry = self._counters.get(key)
+        return entry[0] if entry else 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one in-flight execution.
+
+    The first caller starts the work as a task; later callers await the same task
+    instead of repeating it. Shielded, so a cancelled caller doesn't abort the
+    work for everyone else.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn):
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._pending[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+
+
+shared_cache = SharedCache()
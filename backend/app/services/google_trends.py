@@ -3,7 +3,7 @@ Google Trends data collector for TrendVest.
 Uses pytrends (unofficial Google Trends API) to get interest-over-time data.
 No API key needed — free but rate-limited.
 """
-import time
+import asyncio
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
@@ -52,12 +52,11 @@ class GoogleTrendsCollector:
             if data.empty:
                 return 0
 
-            # Drop 'isPartial' column if present
-            if "isPartial" in data.columns:
-                data = data.drop(columns=["isPartial"])
+            # Drop 'isPartial' in place so only the keyword columns are left, without a copy
+            data.drop(columns=["isPartial"], inplace=True, errors="ignore")
 
             # Average interest across all keywords and time points
-            avg = data.values.mean()
+            avg = data.to_numpy().mean()
             return int(round(avg))
 
         except Exception as e:
@@ -81,15 +80,16 @@ class GoogleTrendsCollector:
         except Exception:
             return []
 
-    def collect_topic(self, topic: dict) -> dict:
+    async def collect_topic(self, topic: dict) -> dict:
         """Collect Google Trends data for a single topic."""
         now = datetime.now(timezone.utc)
         print(f"  Google Trends for: {topic['slug']}...")
 
         try:
             # Use top 3 keywords for interest score
-            score = self.get_interest(topic["keywords"][:3], timeframe="now 7-d")
-            time.sleep(self._rate_limit_delay)
+            # pytrends blocks, so it runs in a thread while the event loop keeps going
+            score = await asyncio.to_thread(self.get_interest, topic["keywords"][:3], "now 7-d")
+            await asyncio.sleep(self._rate_limit_delay)
         except Exception as e:
             print(f"  Failed: {e}")
             score = 0
@@ -105,8 +105,8 @@ class GoogleTrendsCollector:
             "period_end": now,
         }
 
-    def collect_all(self, topics: list[dict]) -> list[dict]:
-        """Collect Google Trends data for all topics."""
+    async def collect_all(self, topics: list[dict]) -> list[dict]:
+        """Collect Google Trends data for all topics, one at a time (pytrends shares one session)."""
         if not TrendReq:
             print("pytrends not installed, skipping Google Trends collection")
             return []
@@ -117,7 +117,7 @@ class GoogleTrendsCollector:
 
         results = []
         for topic in topics:
-            result = self.collect_topic(topic)
+            result = await self.collect_topic(topic)
             results.append(result)
 
         total = sum(r["mention_count"] for r in results)
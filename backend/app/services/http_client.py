@@ -0,0 +1,24 @@
+"""
+Shared outbound HTTP client for TrendVest.
+One httpx.AsyncClient per process so TCP/TLS connections are reused across requests.
+"""
+import httpx
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def aclose_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,110 @@
+"""
+Batched interaction logging for TrendVest.
+/track only enqueues; a background worker drains the queue and writes
+rows to user_interactions with one COPY per batch.
+"""
+import json
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("session_id", "interaction_type", "target_slug", "metadata", "created_at")
+INSERT_SQL = f"""
+    INSERT INTO user_interactions ({", ".join(COLUMNS)})
+    VALUES ($1, $2, $3, $4::jsonb, $5)
+"""
+
+
+class InteractionLog:
+    """Bounded queue of interaction rows flushed to Postgres in batches."""
+
+    def __init__(self, maxsize: int = 10_000, batch_size: int = 100):
+        self._maxsize = maxsize
+        self._queue: asyncio.Queue | None = None
+        self._batch_size = batch_size
+        self._pool = None
+        self._worker: asyncio.Task | None = None
+
+    def start(self, pool):
+        self._pool = pool
+        # Created here so the queue belongs to the serving event loop
+        self._queue = asyncio.Queue(maxsize=self._maxsize)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5):
+        """Give the worker up to `timeout` seconds to flush the queue, then stop it."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self._queue.qsize()} unflushed interactions")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def record(self, session_id: str | None, interaction_type: str,
+               target_slug: str | None, metadata: dict | None) -> bool:
+        """Queue one interaction. Returns False if the queue is full and it was dropped."""
+        row = (
+            session_id, interaction_type, target_slug,
+            json.dumps(metadata) if metadata else None,
+            # Stamped now, so rows keep their request time rather than the flush time
+            datetime.now(timezone.utc),
+        )
+        if self._queue is None:
+            logger.warning("Interaction log not started, dropping event")
+            return False
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            logger.warning("Interaction queue full, dropping event")
+            return False
+        return True
+
+    def _take_batch(self, first: tuple) -> list[tuple]:
+        batch = [first]
+        while len(batch) < self._batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = self._take_batch(await self._queue.get())
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: list[tuple]):
+        try:
+            async with self._pool.acquire() as conn:
+                try:
+                    await conn.copy_records_to_table("user_interactions", records=batch, columns=COLUMNS)
+                except asyncpg.PostgresError as e:
+                    # A COPY fails as a whole; retry row by row so one bad row only loses itself.
+                    # (executemany is atomic too, so it wouldn't help here)
+                    logger.warning(f"Batch COPY of {len(batch)} interactions failed, retrying per row: {e}")
+                    await self._insert_rows(conn, batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} interactions: {e}")
+
+    async def _insert_rows(self, conn, batch: list[tuple]):
+        for row in batch:
+            try:
+                await conn.execute(INSERT_SQL, *row)
+            except asyncpg.PostgresError as e:
+                logger.error(f"Dropping interaction {row[1]!r} for {row[2]!r}: {e}")
+
+
+interaction_log = InteractionLog()
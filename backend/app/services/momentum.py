@@ -9,8 +9,47 @@ Direction:
   score > 80   →  'stable'   (within normal range)
   score <= 80  →  'falling'  (below average)
 """
+from collections import Counter
 from datetime import datetime, timezone, timedelta
 
+# $1 = start of today, $2 = start of the 7-day window. The average is over the days
+# that had mentions, as before, and both sides use idx_mentions_topic_date
+MENTION_STATS_SQL = """
+    WITH today AS (
+        SELECT topic_id, SUM(mention_count) AS total
+        FROM topic_mentions
+        WHERE collected_at >= $1
+        GROUP BY topic_id
+    ), week AS (
+        SELECT topic_id, AVG(daily) AS avg_7d
+        FROM (
+            SELECT topic_id, SUM(mention_count) AS daily
+            FROM topic_mentions
+            WHERE collected_at >= $2 AND collected_at < $1
+            GROUP BY topic_id, DATE(collected_at)
+        ) d
+        GROUP BY topic_id
+    )
+    SELECT t.id, t.slug,
+           COALESCE(today.total, 0)::int AS today_count,
+           COALESCE(week.avg_7d, 0)::float8 AS avg_7d
+    FROM topics t
+    LEFT JOIN today ON today.topic_id = t.id
+    LEFT JOIN week ON week.topic_id = t.id
+    WHERE t.is_active = true
+"""
+
+UPSERT_SCORE_SQL = """
+    INSERT INTO momentum_scores (topic_id, score, mention_count_today, mention_avg_7d, direction, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6)
+    ON CONFLICT (topic_id) DO UPDATE SET
+        score = EXCLUDED.score,
+        mention_count_today = EXCLUDED.mention_count_today,
+        mention_avg_7d = EXCLUDED.mention_avg_7d,
+        direction = EXCLUDED.direction,
+        updated_at = EXCLUDED.updated_at
+"""
+
 
 class MomentumCalculator:
     """Calculates and stores momentum scores for topics."""
@@ -32,47 +71,35 @@ class MomentumCalculator:
         print(f"📈 Momentum Calculation")
         print(f"{'='*50}")
 
-        results = []
-        async with pool.acquire() as conn:
-            topics = await conn.fetch("SELECT id, slug FROM topics WHERE is_active = true")
-
-            for topic in topics:
-                score_data = await self._calculate_topic(conn, topic["id"], topic["slug"])
-                results.append(score_data)
-
-        rising = sum(1 for r in results if r["direction"] == "rising")
-        stable = sum(1 for r in results if r["direction"] == "stable")
-        falling = sum(1 for r in results if r["direction"] == "falling")
-        print(f"\n📊 Results: {rising} rising, {stable} stable, {falling} falling")
-
-        return results
-
-    async def _calculate_topic(self, conn, topic_id: int, slug: str) -> dict:
-        """Calculate momentum for a single topic."""
         now = datetime.now(timezone.utc)
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         week_ago = today_start - timedelta(days=7)
 
-        # Get today's total mentions (all sources)
-        today_count = await conn.fetchval("""
-            SELECT COALESCE(SUM(mention_count), 0)
-            FROM topic_mentions
-            WHERE topic_id = $1 AND collected_at >= $2
-        """, topic_id, today_start) or 0
+        async with pool.acquire() as conn:
+            # Today's count and 7-day daily average for every active topic in one pass
+            rows = await conn.fetch(MENTION_STATS_SQL, today_start, week_ago)
 
-        # Get 7-day daily average
-        daily_totals = await conn.fetch("""
-            SELECT DATE(collected_at) as day, SUM(mention_count) as total
-            FROM topic_mentions
-            WHERE topic_id = $1 AND collected_at >= $2 AND collected_at < $3
-            GROUP BY DATE(collected_at)
-        """, topic_id, week_ago, today_start)
+            results = [self._score_topic(row["id"], row["slug"], row["today_count"], row["avg_7d"])
+                       for row in rows]
 
-        if daily_totals:
-            avg_7d = sum(row["total"] for row in daily_totals) / max(len(daily_totals), 1)
-        else:
-            avg_7d = 0
+            async with conn.transaction():
+                await conn.executemany(UPSERT_SCORE_SQL, [
+                    (r["topic_id"], r["score"], r["mention_count_today"], r["mention_avg_7d"],
+                     r["direction"], now)
+                    for r in results
+                ])
 
+            # Publish the new scores to the ranking view read by /api/trends
+            await conn.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_topic_rank")
+
+        directions = Counter(r["direction"] for r in results)
+        print(f"\n📊 Results: {directions['rising']} rising, {directions['stable']} stable, "
+              f"{directions['falling']} falling")
+
+        return results
+
+    def _score_topic(self, topic_id: int, slug: str, today_count: int, avg_7d: float) -> dict:
+        """Score one topic from its mention stats."""
         # Calculate score
         if avg_7d > 0:
             score = (today_count / avg_7d) * 100
@@ -89,18 +116,6 @@ class MomentumCalculator:
         else:
             direction = "falling"
 
-        # Upsert momentum score
-        await conn.execute("""
-            INSERT INTO momentum_scores (topic_id, score, mention_count_today, mention_avg_7d, direction, updated_at)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            ON CONFLICT (topic_id) DO UPDATE SET
-                score = EXCLUDED.score,
-                mention_count_today = EXCLUDED.mention_count_today,
-                mention_avg_7d = EXCLUDED.mention_avg_7d,
-                direction = EXCLUDED.direction,
-                updated_at = EXCLUDED.updated_at
-        """, topic_id, round(score, 1), int(today_count), round(avg_7d, 1), direction, now)
-
         emoji = "🟢" if direction == "rising" else ("🔴" if direction == "falling" else "🟡")
         print(f"  {emoji} {slug}: score={score:.0f}, today={today_count}, avg7d={avg_7d:.0f}, dir={direction}")
 
@@ -1,16 +1,22 @@
 """
 News data collector for TrendVest.
 Uses NewsAPI.org free tier (100 requests/day).
+Topics are queried concurrently over one keep-alive httpx session.
 """
 import os
-import time
+import asyncio
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
+from .rate_limit import RateLimiter
+
 try:
-    import requests
+    import httpx
 except ImportError:
-    requests = None
+    httpx = None
+
+# Requests in flight at once against newsapi.org
+MAX_CONCURRENT_REQUESTS = 5
 
 
 class NewsCollector:
@@ -20,11 +26,21 @@ class NewsCollector:
 
     def __init__(self):
         self.api_key = os.getenv("NEWS_API_KEY", "")
-        self._rate_limit_delay = 1.0
+        self._rate_limiter = RateLimiter(0.2)
+        self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._session = None
         self._daily_requests = 0
         self._max_daily = 95  # Leave buffer from 100 limit
 
-    def count_mentions(self, keywords: list[str], days_back: int = 1) -> int:
+    def _open_session(self):
+        if httpx is None:
+            raise RuntimeError("httpx not installed. Run: pip install httpx")
+        return httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS),
+        )
+
+    async def count_mentions(self, keywords: list[str], days_back: int = 1) -> int:
         """
         Count news articles mentioning keywords.
 
@@ -38,27 +54,37 @@ class NewsCollector:
         if not self.api_key:
             print("  ⚠️  NEWS_API_KEY not set")
             return 0
+        if httpx is None:
+            raise RuntimeError("httpx not installed. Run: pip install httpx")
 
         if self._daily_requests >= self._max_daily:
             print("  ⚠️  NewsAPI daily limit reached")
             return 0
+        # Counted before the first await, so concurrent topics can't overrun the quota
+        self._daily_requests += 1
 
         # Use top 3 keywords to save query length
         query = " OR ".join(keywords[:3])
         from_date = (datetime.now(timezone.utc) - timedelta(days=days_back)).strftime("%Y-%m-%d")
 
+        params = {
+            "q": query,
+            "from": from_date,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "pageSize": 1,  # We only need totalResults
+            "apiKey": self.api_key,
+        }
+
         try:
-            response = requests.get(self.BASE_URL, params={
-                "q": query,
-                "from": from_date,
-                "language": "en",
-                "sortBy": "publishedAt",
-                "pageSize": 1,  # We only need totalResults
-                "apiKey": self.api_key,
-            }, timeout=10)
-
-            self._daily_requests += 1
-            time.sleep(self._rate_limit_delay)
+            async with self._request_slots:
+                await self._rate_limiter.wait()
+                if self._session is not None:
+                    response = await self._session.get(self.BASE_URL, params=params)
+                else:
+                    # Called outside collect_all — use a one-off session
+                    async with self._open_session() as session:
+                        response = await session.get(self.BASE_URL, params=params)
 
             if response.status_code == 200:
                 data = response.json()
@@ -71,12 +97,12 @@ class NewsCollector:
             print(f"  ❌ NewsAPI error: {e}")
             return 0
 
-    def collect_topic(self, topic: dict) -> dict:
+    async def collect_topic(self, topic: dict) -> dict:
         """Collect news mention data for a single topic."""
         now = datetime.now(timezone.utc)
         print(f"  📰 Collecting news for: {topic['slug']}...")
 
-        count = self.count_mentions(topic["keywords"])
+        count = await self.count_mentions(topic["keywords"])
         print(f"  ✅ {topic['slug']}: {count} articles")
 
         return {
@@ -88,20 +114,25 @@ class NewsCollector:
             "period_end": now,
         }
 
-    def collect_all(self, topics: list[dict]) -> list[dict]:
+    async def collect_all(self, topics: list[dict]) -> list[dict]:
         """Collect news data for all topics."""
         print(f"\n{'='*50}")
         print(f"📰 News Collection — {len(topics)} topics")
         print(f"   (API requests used: {self._daily_requests}/{self._max_daily})")
         print(f"{'='*50}")
 
-        results = []
-        for topic in topics:
-            if self._daily_requests >= self._max_daily:
-                print(f"  ⛔ Daily limit reached, skipping remaining topics")
-                break
-            result = self.collect_topic(topic)
-            results.append(result)
+        remaining = self._max_daily - self._daily_requests
+        if len(topics) > remaining:
+            print(f"  ⛔ Daily limit reached, skipping remaining topics")
+            topics = topics[:max(remaining, 0)]
+
+        # One session for the whole run, so the TLS handshake is paid once per connection
+        async with self._open_session() as session:
+            self._session = session
+            try:
+                results = await asyncio.gather(*(self.collect_topic(topic) for topic in topics))
+            finally:
+                self._session = None
 
         total = sum(r["mention_count"] for r in results)
         print(f"\n📊 Total articles found: {total}")
@@ -0,0 +1,21 @@
+"""
+Request pacing for the TrendVest data collectors.
+"""
+import asyncio
+
+
+class RateLimiter:
+    """Spaces request starts `interval` seconds apart, shared by all concurrent tasks."""
+
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # Claim the next free slot before sleeping, so waiters queue up in order
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
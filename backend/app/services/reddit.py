@@ -1,18 +1,23 @@
 """
 Reddit data collector for TrendVest.
-Uses PRAW (Python Reddit API Wrapper) to count keyword mentions.
+Uses Async PRAW (Python Reddit API Wrapper) to count keyword mentions.
+Searches for all topics and subreddits run concurrently, paced by a shared rate limiter.
 """
 import os
 import asyncio
-import time
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
+from .rate_limit import RateLimiter
+
 try:
-    import praw
+    import asyncpraw
 except ImportError:
-    praw = None
-    print("⚠️  praw not installed. Run: pip install praw")
+    asyncpraw = None
+    print("⚠️  asyncpraw not installed. Run: pip install asyncpraw")
+
+# Searches in flight at once; the rate limiter decides how fast new ones start
+MAX_CONCURRENT_SEARCHES = 8
 
 
 class RedditCollector:
@@ -23,26 +28,38 @@ class RedditCollector:
         self.client_secret = os.getenv("REDDIT_CLIENT_SECRET", "")
         self.user_agent = os.getenv("REDDIT_USER_AGENT", "TrendVest/1.0")
         self._reddit = None
-        self._rate_limit_delay = 1.0  # seconds between requests
+        # Reddit allows 60 requests/minute, so at most one search per second
+        self._rate_limiter = RateLimiter(1.0)
+        self._search_slots = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
 
-    @property
-    def reddit(self):
-        """Lazy init Reddit client."""
+    def _ensure_client(self):
+        """Create the Reddit client if needed; raises if asyncpraw or credentials are missing."""
         if self._reddit is None:
-            if not praw:
-                raise RuntimeError("praw not installed")
+            if not asyncpraw:
+                raise RuntimeError("asyncpraw not installed")
             if not self.client_id or not self.client_secret:
                 raise RuntimeError("Reddit credentials not set. Set REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET")
 
-            self._reddit = praw.Reddit(
+            self._reddit = asyncpraw.Reddit(
                 client_id=self.client_id,
                 client_secret=self.client_secret,
                 user_agent=self.user_agent,
             )
         return self._reddit
 
-    def count_mentions(self, keywords: list[str], subreddits: list[str],
-                       time_filter: str = "day", limit: int = 100) -> int:
+    @property
+    def reddit(self):
+        """Lazy init Reddit client. Must be first used inside the running event loop."""
+        return self._ensure_client()
+
+    async def close(self):
+        """Close the Reddit client's HTTP session."""
+        if self._reddit is not None:
+            await self._reddit.close()
+            self._reddit = None
+
+    async def count_mentions(self, keywords: list[str], subreddits: list[str],
+                             time_filter: str = "day", limit: int = 100) -> int:
         """
         Count mentions of keywords across subreddits.
 
@@ -55,29 +72,32 @@ class RedditCollector:
         Returns:
             Total mention count
         """
-        total = 0
         query = " OR ".join(f'"{kw}"' if " " in kw else kw for kw in keywords[:5])  # Top 5 keywords
 
-        for sub_name in subreddits:
+        counts = await asyncio.gather(*(
+            self._count_subreddit(sub_name, query, time_filter, limit) for sub_name in subreddits
+        ))
+        return sum(counts)
+
+    async def _count_subreddit(self, sub_name: str, query: str, time_filter: str, limit: int) -> int:
+        """Number of matching posts in one subreddit, 0 on error."""
+        async with self._search_slots:
+            await self._rate_limiter.wait()
             try:
-                subreddit = self.reddit.subreddit(sub_name)
+                subreddit = await self.reddit.subreddit(sub_name)
                 results = subreddit.search(
                     query=query,
                     time_filter=time_filter,
                     sort="new",
                     limit=limit
                 )
-                count = sum(1 for _ in results)
-                total += count
-                time.sleep(self._rate_limit_delay)  # Rate limiting
+                return sum([1 async for _ in results])
 
             except Exception as e:
                 print(f"  ⚠️  Error searching r/{sub_name}: {e}")
-                continue
+                return 0
 
-        return total
-
-    def collect_topic(self, topic: dict) -> dict:
+    async def collect_topic(self, topic: dict) -> dict:
         """
         Collect mention data for a single topic.
 
@@ -91,7 +111,7 @@ class RedditCollector:
         print(f"  📡 Collecting r/ data for: {topic['slug']}...")
 
         try:
-            count = self.count_mentions(
+            count = await self.count_mentions(
                 keywords=topic["keywords"],
                 subreddits=topic.get("subreddits", ["wallstreetbets", "stocks", "investing"]),
                 time_filter="day",
@@ -112,16 +132,18 @@ class RedditCollector:
             "period_end": now,
         }
 
-    def collect_all(self, topics: list[dict]) -> list[dict]:
+    async def collect_all(self, topics: list[dict]) -> list[dict]:
         """Collect data for all topics. Returns list of mention records."""
         print(f"\n{'='*50}")
         print(f"🔴 Reddit Collection — {len(topics)} topics")
         print(f"{'='*50}")
 
-        results = []
-        for topic in topics:
-            result = self.collect_topic(topic)
-            results.append(result)
+        # Fail fast on missing credentials rather than once per search
+        self._ensure_client()
+        try:
+            results = await asyncio.gather(*(self.collect_topic(topic) for topic in topics))
+        finally:
+            await self.close()
 
         total = sum(r["mention_count"] for r in results)
         print(f"\n📊 Total mentions collected: {total}")
@@ -3,10 +3,14 @@ Stock price service for TrendVest.
 Uses yfinance for free stock data with in-memory caching.
 """
 import logging
+import threading
 from datetime import datetime, timezone
+from pathlib import Path
 from typing import Optional
 from dataclasses import dataclass
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -15,6 +19,10 @@ except ImportError:
     yf = None
     logger.warning("yfinance not installed. Run: pip install yfinance")
 
+# yf.download keeps its results in module globals that every call resets, so
+# overlapping downloads from different threads clobber each other
+_download_lock = threading.Lock()
+
 
 @dataclass
 class StockPrice:
@@ -40,21 +48,22 @@ class StockPriceService:
     def _evict_stale(self):
         """Remove cache entries older than STALE_TTL."""
         now = datetime.now(timezone.utc)
+        # Snapshot first — batches may run concurrently in worker threads
         stale_keys = [
-            k for k, v in self._cache.items()
+            k for k, v in list(self._cache.items())
             if (now - v.fetched_at).total_seconds() > self.STALE_TTL
         ]
         for k in stale_keys:
-            del self._cache[k]
+            self._cache.pop(k, None)
 
     def _enforce_cache_limit(self):
         """Evict oldest entries if cache exceeds MAX_CACHE_SIZE."""
         if len(self._cache) <= self.MAX_CACHE_SIZE:
             return
-        sorted_entries = sorted(self._cache.items(), key=lambda x: x[1].fetched_at)
-        to_remove = len(self._cache) - self.MAX_CACHE_SIZE
+        sorted_entries = sorted(list(self._cache.items()), key=lambda x: x[1].fetched_at)
+        to_remove = len(sorted_entries) - self.MAX_CACHE_SIZE
         for k, _ in sorted_entries[:to_remove]:
-            del self._cache[k]
+            self._cache.pop(k, None)
 
     def get_price(self, ticker: str) -> Optional[StockPrice]:
         """Get current stock price with caching."""
@@ -111,8 +120,8 @@ class StockPriceService:
         # Check cache first
         uncached = []
         for ticker in tickers:
-            if ticker in self._cache:
-                cached = self._cache[ticker]
+            cached = self._cache.get(ticker)
+            if cached is not None:
                 age = (datetime.now(timezone.utc) - cached.fetched_at).total_seconds()
                 if age < self.CACHE_TTL:
                     results[ticker] = cached
@@ -120,14 +129,15 @@ class StockPriceService:
             uncached.append(ticker)
 
         if not uncached or not yf:
-            return results
+            return self._fill_from_stale(results, uncached)
 
         # Batch download in chunks to limit peak RAM usage
         for i in range(0, len(uncached), self.BATCH_CHUNK_SIZE):
             chunk = uncached[i : i + self.BATCH_CHUNK_SIZE]
             try:
                 tickers_str = " ".join(chunk)
-                data = yf.download(tickers_str, period="2d", progress=False, threads=True)
+                with _download_lock:
+                    data = yf.download(tickers_str, period="2d", progress=False, threads=True)
 
                 if data.empty:
                     logger.warning("Batch download returned empty data for chunk %d", i)
@@ -168,10 +178,61 @@ class StockPriceService:
             except Exception as e:
                 logger.warning("Batch download failed for chunk %d: %s", i, e)
 
+        self._fill_from_stale(results, uncached)
         self._evict_stale()
         self._enforce_cache_limit()
         return results
 
+    def _fill_from_stale(self, results: dict, tickers: list[str]) -> dict:
+        """Serve last-known prices for tickers that could not be refreshed."""
+        for ticker in tickers:
+            if ticker not in results:
+                # One lookup: another thread's batch may evict the entry at any point
+                cached = self._cache.get(ticker)
+                if cached is not None:
+                    results[ticker] = cached
+        return results
+
+    def save_snapshot(self, path: Path) -> int:
+        """Write the price cache to disk so a restart can start warm."""
+        entries = list(self._cache.values())
+        try:
+            path.write_bytes(orjson.dumps(entries))
+        except OSError as e:
+            logger.warning("Could not write price snapshot %s: %s", path, e)
+            return 0
+        return len(entries)
+
+    def load_snapshot(self, path: Path) -> int:
+        """Load a snapshot written by save_snapshot, skipping entries older than STALE_TTL."""
+        try:
+            entries = orjson.loads(path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return 0
+
+        prices = []
+        for entry in entries:
+            try:
+                prices.append(StockPrice(**{**entry, "fetched_at": datetime.fromisoformat(entry["fetched_at"])}))
+            except (TypeError, KeyError, ValueError):
+                continue
+        return self.restore(prices)
+
+    def restore(self, prices: list[StockPrice]) -> int:
+        """Seed the cache with previously fetched prices, keeping whichever copy is newer."""
+        now = datetime.now(timezone.utc)
+        loaded = 0
+        for sp in prices:
+            if (now - sp.fetched_at).total_seconds() > self.STALE_TTL:
+                continue
+            cached = self._cache.get(sp.ticker)
+            if cached and cached.fetched_at >= sp.fetched_at:
+                continue
+            self._cache[sp.ticker] = sp
+            loaded += 1
+        self._enforce_cache_limit()
+        return loaded
+
     def clear_cache(self):
         """Clear the price cache."""
         self._cache.clear()
@@ -6,14 +6,31 @@ by providing curated fallback insights.
 """
 import os
 import json
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+from .ai_explainer import CLAUDE_TIMEOUT, claude_slots
+from .http_client import get_http_client
+
 try:
     import anthropic
 except ImportError:
     anthropic = None
 
+_aclient = None
+
+
+def _get_aclient(api_key: str):
+    """One AsyncAnthropic per process, on the shared pooled httpx client."""
+    global _aclient
+    if _aclient is None:
+        _aclient = anthropic.AsyncAnthropic(
+            api_key=api_key, max_retries=2, timeout=CLAUDE_TIMEOUT,
+            http_client=get_http_client(),
+        )
+    return _aclient
+
 # ── Curated insights (lazy-loaded to save ~200KB when not used) ──
 
 _TOPIC_INSIGHTS: dict[str, dict] | None = None
@@ -292,6 +309,9 @@ def _build_insights():
     return topic_insights, related_topics, hidden_connections
 
 
+# The curated data never changes at runtime, so each (slug, language) is assembled once.
+# Callers share the returned dict and must not mutate it.
+@lru_cache(maxsize=1024)
 def get_topic_insight(slug: str, language: str = "en") -> Optional[dict]:
     """Get curated insight for a topic, including related topics and hidden connections."""
     insight = _get_topic_insights().get(slug)
@@ -322,6 +342,13 @@ def get_topic_insight(slug: str, language: str = "en") -> Optional[dict]:
     }
 
 
+@lru_cache(maxsize=4096)
+def get_stock_connection(slug: str, language: str, ticker: str) -> Optional[str]:
+    """Curated sentence on how `ticker` (upper-case) ties into the topic, if any."""
+    insight = get_topic_insight(slug, language)
+    return insight["stock_connections"].get(ticker) if insight else None
+
+
 def get_all_insights(language: str = "en") -> list[dict]:
     """Get all available topic insights."""
     results = []
@@ -361,12 +388,12 @@ Rules:
 - Write in {lang}"""
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
-        response = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=600,
-            messages=[{"role": "user", "content": prompt}],
-        )
+        async with claude_slots:
+            response = await _get_aclient(api_key).messages.create(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=600,
+                messages=[{"role": "user", "content": prompt}],
+            )
         return {
             "slug": slug,
             "ai_analysis": response.content[0].text,
@@ -6,7 +6,7 @@ or Basic tier: 10k reads/month).
 Also supports scraping public search counts without auth as a fallback.
 """
 import os
-import time
+import asyncio
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
@@ -35,7 +35,7 @@ class XTwitterCollector:
             "User-Agent": "TrendVest/1.0",
         }
 
-    def count_mentions(self, keywords: list[str], hours_back: int = 24) -> int:
+    async def count_mentions(self, keywords: list[str], hours_back: int = 24) -> int:
         """
         Count recent tweets mentioning keywords.
 
@@ -73,7 +73,9 @@ class XTwitterCollector:
             start_time = (datetime.now(timezone.utc) - timedelta(hours=hours_back)).strftime(
                 "%Y-%m-%dT%H:%M:%SZ"
             )
-            response = req_lib.get(
+            # requests blocks, so each call runs in a thread
+            response = await asyncio.to_thread(
+                req_lib.get,
                 self.COUNT_URL,
                 headers=self._headers(),
                 params={
@@ -84,7 +86,7 @@ class XTwitterCollector:
                 timeout=10,
             )
             self._daily_requests += 1
-            time.sleep(self._rate_limit_delay)
+            await asyncio.sleep(self._rate_limit_delay)
 
             if response.status_code == 200:
                 data = response.json()
@@ -100,7 +102,8 @@ class XTwitterCollector:
 
         # Fallback: use search endpoint and count results
         try:
-            response = req_lib.get(
+            response = await asyncio.to_thread(
+                req_lib.get,
                 self.SEARCH_URL,
                 headers=self._headers(),
                 params={
@@ -111,7 +114,7 @@ class XTwitterCollector:
                 timeout=10,
             )
             self._daily_requests += 1
-            time.sleep(self._rate_limit_delay)
+            await asyncio.sleep(self._rate_limit_delay)
 
             if response.status_code == 200:
                 data = response.json()
@@ -190,12 +193,12 @@ class XTwitterCollector:
             print(f"  X API tweets error: {e}")
             return []
 
-    def collect_topic(self, topic: dict) -> dict:
+    async def collect_topic(self, topic: dict) -> dict:
         """Collect X/Twitter mention data for a single topic."""
         now = datetime.now(timezone.utc)
         print(f"  X/Twitter for: {topic['slug']}...")
 
-        count = self.count_mentions(topic["keywords"], hours_back=24)
+        count = await self.count_mentions(topic["keywords"], hours_back=24)
         print(f"  {topic['slug']}: {count} tweets")
 
         return {
@@ -207,7 +210,7 @@ class XTwitterCollector:
             "period_end": now,
         }
 
-    def collect_all(self, topics: list[dict]) -> list[dict]:
+    async def collect_all(self, topics: list[dict]) -> list[dict]:
         """Collect X/Twitter data for all topics."""
         if not self.bearer_token:
             print("X_BEARER_TOKEN not set, skipping X collection")
@@ -223,7 +226,7 @@ class XTwitterCollector:
             if self._daily_requests >= self._max_daily:
                 print("  Daily limit reached, skipping remaining topics")
                 break
-            result = self.collect_topic(topic)
+            result = await self.collect_topic(topic)
             results.append(result)
 
         total = sum(r["mention_count"] for r in results)
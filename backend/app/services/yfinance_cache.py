@@ -0,0 +1,43 @@
+"""
+Cached yfinance lookups for TrendVest.
+Ticker.info is a slow, blocking fetch against Yahoo, so results are kept for ten
+minutes and misses run in a worker thread.
+"""
+import time
+import asyncio
+import logging
+
+from cachetools import TTLCache
+
+from .cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+    logger.warning("yfinance not installed. Run: pip install yfinance")
+
+INFO_TTL = 600  # 10 minutes
+
+_info_cache = TTLCache(maxsize=2048, ttl=INFO_TTL, timer=time.monotonic)
+# Concurrent misses for the same ticker share one fetch
+_info_flight = SingleFlight()
+
+
+async def get_info(ticker: str) -> dict:
+    """Return yf.Ticker(ticker).info, cached. Errors from yfinance propagate to the caller."""
+    info = _info_cache.get(ticker)
+    if info is None:
+        info = await _info_flight.do(ticker, lambda: _fetch_info(ticker))
+    return info
+
+
+async def _fetch_info(ticker: str) -> dict:
+    if yf is None:
+        raise RuntimeError("yfinance not available")
+    info = await asyncio.to_thread(lambda: yf.Ticker(ticker).info)
+    if info:
+        _info_cache[ticker] = info
+    return info
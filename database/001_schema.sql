@@ -48,6 +48,23 @@ CREATE TABLE IF NOT EXISTS momentum_scores (
     UNIQUE(topic_id)
 );
 
+-- Small key/value store for app bookkeeping (e.g. hash of the last seeded topics.json)
+CREATE TABLE IF NOT EXISTS app_meta (
+    key VARCHAR(50) PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Last known price per ticker, used to warm the API's price cache on startup
+CREATE TABLE IF NOT EXISTS stock_prices (
+    ticker VARCHAR(10) PRIMARY KEY,
+    price FLOAT NOT NULL,
+    change FLOAT NOT NULL DEFAULT 0,
+    change_pct FLOAT NOT NULL DEFAULT 0,
+    previous_close FLOAT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 -- ══════════════════════════════════════
 -- AUTH TABLES
 -- ══════════════════════════════════════
@@ -130,11 +147,47 @@ CREATE TABLE IF NOT EXISTS paper_holdings (
 CREATE INDEX IF NOT EXISTS idx_mentions_topic_date ON topic_mentions(topic_id, collected_at DESC);
 CREATE INDEX IF NOT EXISTS idx_mentions_source ON topic_mentions(source, collected_at DESC);
 CREATE INDEX IF NOT EXISTS idx_momentum_score ON momentum_scores(score DESC);
-CREATE INDEX IF NOT EXISTS idx_topic_stocks_ticker ON topic_stocks(ticker);
+-- (ticker, topic_id) also serves ticker-only lookups, replacing the old single-column index
+DROP INDEX IF EXISTS idx_topic_stocks_ticker;
+CREATE INDEX IF NOT EXISTS idx_topic_stocks_ticker_topic ON topic_stocks(ticker, topic_id);
+CREATE INDEX IF NOT EXISTS idx_topics_active ON topics(id) WHERE is_active = true;
 CREATE INDEX IF NOT EXISTS idx_paper_trades_session ON paper_trades(session_id, executed_at DESC);
 CREATE INDEX IF NOT EXISTS idx_user_interactions_user ON user_interactions(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_user_interactions_session ON user_interactions(session_id, created_at DESC);
 
+-- Trigram indexes for the screener's ILIKE '%...%' search. pg_trgm may be missing or
+-- not installable by this role, in which case search just falls back to a scan.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS idx_topic_stocks_ticker_trgm ON topic_stocks USING gin (ticker gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS idx_topic_stocks_company_trgm ON topic_stocks USING gin (company_name gin_trgm_ops);
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_trgm unavailable, skipping trigram indexes: %', SQLERRM;
+END $$;
+
+-- ══════════════════════════════════════
+-- MATERIALIZED VIEWS
+-- ══════════════════════════════════════
+
+-- Active topics with their momentum, pre-joined so /api/trends ranks with an index scan
+-- instead of a join + sort per request. Refreshed by the momentum job and after seeding.
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_topic_rank AS
+SELECT t.id, t.slug, t.name_en, t.name_he, t.sector, t.sector_en,
+       COALESCE(m.score, 0) AS score,
+       COALESCE(m.direction, 'stable') AS direction,
+       COALESCE(m.mention_count_today, 0) AS mention_count_today,
+       COALESCE(m.mention_avg_7d, 0) AS mention_avg_7d
+FROM topics t
+LEFT JOIN momentum_scores m ON t.id = m.topic_id
+WHERE t.is_active = true;
+
+-- The unique index is what allows REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_topic_rank_id ON mv_topic_rank(id);
+CREATE INDEX IF NOT EXISTS idx_mv_topic_rank_score ON mv_topic_rank(score DESC);
+CREATE INDEX IF NOT EXISTS idx_mv_topic_rank_sector ON mv_topic_rank(sector, score DESC);
+CREATE INDEX IF NOT EXISTS idx_mv_topic_rank_sector_en ON mv_topic_rank(sector_en, score DESC);
+
 -- ══════════════════════════════════════
 -- FUNCTIONS
 -- ══════════════════════════════════════